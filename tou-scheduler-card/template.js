@@ -225,10 +225,10 @@ export function getTemplate(image_url) {
           </button>
           <div class="boost-mode">
             <select id="mode-select">
-              <option value="Automatic">Automatic</option>
-              <option value="Manual" selected>Manual</option>
-              <option value="Testing">Testing</option>
-              <option value="Off">Off</option>
+              <option value="automatic">Automatic</option>
+              <option value="manual" selected>Manual</option>
+              <option value="testing">Testing</option>
+              <option value="off">Off</option>
             </select>
           </div>
           <button class="settings-button">
@@ -361,7 +361,7 @@ class TouSchedulerCard extends HTMLElement {
     const buttons = this.shadowRoot.querySelectorAll(".button");
     if (manNumber) {
       manNumber.textContent = this._manual;
-      if (this._boostMode === "Automatic" || this._boostMode === "Off") {
+      if (this._boostMode === "automatic" || this._boostMode === "off") {
         manNumber.setAttribute("font-size", NON_ACTIVE_FONT_SIZE);
         buttons.forEach((button) => (button.style.display = "none"));
       } else {
@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
+from datetime import datetime
 import logging
 
+import aiohttp
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_change
 
 # from homeassistant.helpers.typing import ConfigType
 from .const import DOMAIN, PLATFORMS
@@ -19,113 +25,128 @@ _LOGGER = logging.getLogger(__name__)
 # Define the configuration schema
 # CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
+# Single setting services: service name -> (service data key, TOUScheduler method)
+_SETTING_SERVICES: dict[str, tuple[str, str]] = {
+    "set_boost": ("boost", "set_boost"),
+    "set_manual_grid_boost": ("manual_grid_boost", "set_manual_grid_boost"),
+    "set_solcast_percentile": ("percentile", "set_solcast_percentile"),
+    "set_solcast_update_hour": ("update_hour", "set_solcast_update_hour"),
+    "set_days_of_load_history": ("days_of_load_history", "set_days_of_load_history"),
+}
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up TOU Scheduler from a config entry."""
     _LOGGER.info("Setting up TOU Scheduler entry: %s", entry.entry_id)
+    # Initialize the Inverter API
+    inverter_api = InverterAPI(
+        username=entry.data["username"],
+        password=entry.data["password"],
+        timezone=hass.config.time_zone,
+    )
+    # Home Assistant retries the setup later if the cloud can't be reached or the sign in fails
     try:
-        # Initialize the Inverter API
-        inverter_api = InverterAPI(
-            username=entry.data["username"],
-            password=entry.data["password"],
-            timezone=hass.config.time_zone,
-        )
-        await inverter_api.authenticate()
-
-        # Initialize the Solcast API
-        solcast_api = SolcastAPI(
-            api_key=entry.data["api_key"],
-            resource_id=entry.data["resource_id"],
-            timezone=hass.config.time_zone,
-        )
-
-        # Initialize the TOU Scheduler
-        tou_scheduler = TOUScheduler(
-            hass=hass,
-            config_entry=entry,
-            timezone=hass.config.time_zone,
-            inverter_api=inverter_api,
-            solcast_api=solcast_api,
-            coordinator=None,  # Temporarily set to None
-        )
-
-        # Create the UpdateCoordinator
-        coordinator = TOUUpdateCoordinator(
-            hass=hass,
-            update_method=tou_scheduler.to_dict,
-        )
+        authenticated = await inverter_api.authenticate()
+    except (aiohttp.ClientError, TimeoutError) as e:
+        await inverter_api.aclose()
+        raise ConfigEntryNotReady(f"Unable to reach the Sol-Ark cloud: {e}") from e
+    if not authenticated:
+        await inverter_api.aclose()
+        raise ConfigEntryNotReady("Unable to sign in to the Sol-Ark cloud")
+
+    # Initialize the Solcast API
+    solcast_api = SolcastAPI(
+        api_key=entry.data["api_key"],
+        resource_id=entry.data["resource_id"],
+        timezone=hass.config.time_zone,
+        session=async_get_clientsession(hass),
+    )
+
+    # Initialize the TOU Scheduler
+    tou_scheduler = TOUScheduler(
+        hass=hass,
+        config_entry=entry,
+        timezone=hass.config.time_zone,
+        inverter_api=inverter_api,
+        solcast_api=solcast_api,
+        coordinator=None,  # Temporarily set to None
+    )
+
+    # Create the UpdateCoordinator
+    coordinator = TOUUpdateCoordinator(
+        hass=hass,
+        update_method=tou_scheduler.async_update_data,
+    )
+
+    # Assign the coordinator to the TOUScheduler instance
+    tou_scheduler.coordinator = coordinator
+
+    # Load the stored shading, forecast and options before the first refresh. If either fails the setup is
+    #  retried with new objects, so close the signed-in session (and stop the options listener) first.
+    try:
+        await tou_scheduler.async_start()
         await coordinator.async_config_entry_first_refresh()
+    except BaseException:
+        tou_scheduler.async_stop()
+        await inverter_api.aclose()
+        await solcast_api.aclose()
+        raise
+    # The first hourly update can wait on Solcast (and its retries), so run it in the background rather than
+    #  holding up the setup. The sensors start with the inverter data and are updated when it is done.
+    entry.async_create_background_task(
+        hass, tou_scheduler.async_hourly_update(), "tou_scheduler startup hourly update"
+    )
+
+    # The hourly work is due at ten past the hour. Home Assistant schedules this against an absolute
+    #  time each hour, so it never drifts, and the sensors are refreshed as soon as it is done.
+    async def handle_hourly_refresh(now: datetime) -> None:
+        """Do the hourly updates at ten past each hour."""
+        await tou_scheduler.async_hourly_update()
+
+    entry.async_on_unload(
+        async_track_time_change(hass, handle_hourly_refresh, minute=10, second=0)
+    )
+
+    # Store the TOUScheduler instance in hass.data[DOMAIN]
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "coordinator": coordinator,
+        "tou_scheduler": tou_scheduler,
+    }
+
+    # Forward the setup to the sensor platform
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Register custom services
+    async def handle_setting(call: ServiceCall) -> None:
+        """Handle a single setting service call, such as set_boost."""
+        key, method = _SETTING_SERVICES[call.service]
+        await getattr(tou_scheduler, method)(call.data[key])
+
+    async def handle_service_settings(call: ServiceCall) -> None:
+        """Accept all settings values and update the integration."""
+        boost_mode: str = call.data.get("boost_mode", "manual")
+        confidence: int = call.data.get("confidence", 25)
+        load_days: int = call.data.get("load_days", 7)
+        manual_grid_boost: int = call.data.get("manual_grid_boost", 50)
+        min_battery_soc: int = call.data.get("min_battery_soc", 15)
+        update_hour: int = call.data.get("update_hour", 23)
+
+        # Access the TOUScheduler instance from hass.data[DOMAIN]
+        tou_scheduler = hass.data[DOMAIN][entry.entry_id]["tou_scheduler"]
+
+        # Update the TOU Scheduler entity with the new settings
+        await tou_scheduler.async_update_boost_settings(
+            boost_mode,
+            manual_grid_boost,
+            min_battery_soc,
+            confidence,
+            load_days,
+            update_hour,
+        )
 
-        # Assign the coordinator to the TOUScheduler instance
-        tou_scheduler.coordinator = coordinator
-
-        # Store the TOUScheduler instance in hass.data[DOMAIN]
-        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
-            "coordinator": coordinator,
-            "tou_scheduler": tou_scheduler,
-        }
-
-        # Forward the setup to the sensor platform
-        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-
-        # Register custom services
-        async def handle_set_boost(call: ServiceCall) -> None:
-            """Handle the set_boost service call."""
-            boost = call.data["boost"]
-            await tou_scheduler.set_boost(boost)
-
-        async def handle_set_manual_grid_boost(call: ServiceCall) -> None:
-            """Handle the set_manual_grid_boost service call."""
-            manual_grid_boost = call.data["manual_grid_boost"]
-            await tou_scheduler.set_manual_grid_boost(manual_grid_boost)
-
-        async def handle_set_solcast_percentile(call: ServiceCall) -> None:
-            """Handle the set_solcast_percentile service call."""
-            percentile = call.data["percentile"]
-            await tou_scheduler.set_solcast_percentile(percentile)
-
-        async def handle_set_solcast_update_hours(call: ServiceCall) -> None:
-            """Handle the set_solcast_update_hours service call."""
-            update_hour = call.data["update_hour"]
-            await tou_scheduler.set_solcast_update_hour(update_hour)
-
-        async def handle_set_days_of_load_history(call: ServiceCall) -> None:
-            """Handle the set_days_of_load_history service call."""
-            days_of_load_history = call.data["days_of_load_history"]
-            await tou_scheduler.set_days_of_load_history(days_of_load_history)
-
-        async def handle_service_settings(call: ServiceCall) -> None:
-            """Accept all settings values and update the integration."""
-            boost_mode: str = call.data.get("boost_mode", "manual")
-            confidence: int = call.data.get("confidence", 25)
-            load_days: int = call.data.get("load_days", 7)
-            manual_grid_boost: int = call.data.get("manual_grid_boost", 50)
-            min_battery_soc: int = call.data.get("min_battery_soc", 15)
-            update_hour: int = call.data.get("update_hour", 23)
-
-            # Access the TOUScheduler instance from hass.data[DOMAIN]
-            tou_scheduler = hass.data[DOMAIN][entry.entry_id]["tou_scheduler"]
-
-            # Update the TOU Scheduler entity with the new settings
-            await tou_scheduler.async_update_boost_settings(
-                boost_mode,
-                manual_grid_boost,
-                min_battery_soc,
-                confidence,
-                load_days,
-                update_hour,
-            )
-
-        hass.services.async_register(DOMAIN, "set_boost", handle_set_boost)
-        hass.services.async_register(DOMAIN, "set_manual_grid_boost", handle_set_manual_grid_boost)
-        hass.services.async_register(DOMAIN, "set_solcast_percentile", handle_set_solcast_percentile)
-        hass.services.async_register(DOMAIN, "set_solcast_update_hour", handle_set_solcast_update_hours)
-        hass.services.async_register(DOMAIN, "set_days_of_load_history", handle_set_days_of_load_history)
-        hass.services.async_register(DOMAIN, "set_boost_settings", handle_service_settings)
-
-    except Exception as e:  # noqa: BLE001
-        _LOGGER.error("Error setting up TOU Scheduler entry: %s", e)
-        return False
+    for service in _SETTING_SERVICES:
+        hass.services.async_register(DOMAIN, service, handle_setting)
+    hass.services.async_register(DOMAIN, "set_boost_settings", handle_service_settings)
 
     return True
 
@@ -133,14 +154,19 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload the config entry."""
     _LOGGER.info("Unloading TOU Scheduler entry: %s", entry.entry_id)
-    try:
-        coordinator = hass.data[DOMAIN].get(entry.entry_id)
-        if coordinator:
-            await coordinator.tou_scheduler.close_session()
-        unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
-        if unload_ok:
-            hass.data[DOMAIN].pop(entry.entry_id)
-    except KeyError as e:
-        _LOGGER.error("Error unloading TOU Scheduler entry: %s", e)
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if not unload_ok:
         return False
-    return unload_ok
+
+    # Stop the scheduled refreshes and the queued options write before closing the sessions they use. (Safe
+    #  to repeat: the entry is only found once.)
+    domain_data = hass.data.get(DOMAIN, {})
+    entry_data = domain_data.pop(entry.entry_id, None)
+    if entry_data:
+        await entry_data["coordinator"].async_shutdown()
+        entry_data["tou_scheduler"].async_stop()
+        await entry_data["tou_scheduler"].inverter_api.aclose()
+        await entry_data["tou_scheduler"].solcast_api.aclose()
+    if not domain_data:
+        hass.data.pop(DOMAIN, None)
+    return True
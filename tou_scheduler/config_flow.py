@@ -1,6 +1,7 @@
 """Config flow for Time of Use Scheduler."""
 
 from collections.abc import Mapping
+from functools import lru_cache
 import logging
 from typing import Any
 
@@ -8,6 +9,7 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .const import DOMAIN
 from .solark_inverter_api import InverterAPI
@@ -34,23 +36,46 @@ DATA_SCHEMA_STEP_2 = vol.Schema(
 # Helper functions to get options from the user
 def int_list_to_string(int_list) -> str:
     """Convert a list of integers to a string."""
-    return ", ".join(map(str, int_list))
+    return ",".join(map(str, int_list))
 
 
 def string_to_int_list(string_list) -> list[int]:
     """Convert a string containing one or more integers into a list of ints."""
-    return [int(i.strip()) for i in string_list.split(",") if i.strip().isdigit()]
+    int_list = []
+    for item in string_list.split(","):
+        # int() ignores surrounding whitespace; skip anything that is not an integer
+        try:
+            int_list.append(int(item))
+        except ValueError:
+            continue
+    return int_list
 
 
 def get_options_schema(options: Mapping[str, Any]) -> vol.Schema:
     """Return the options schema."""
-    boost = options.get("boost_mode", "testing")
-    forecast_hours = options.get("forecast_hours", "23")
-    manual_grid_boost = options.get("manual_grid_boost", 50)
-    history_days = options.get("history_days", "7")
-    min_battery_soc = options.get("min_battery_soc", 15)
-    percentile = options.get("percentile", 25)
+    return _options_schema(
+        options.get("boost_mode", "testing"),
+        options.get("forecast_hours", "23"),
+        options.get("manual_grid_boost", 50),
+        options.get("history_days", "7"),
+        options.get("min_battery_soc", 15),
+        options.get("percentile", 25),
+    )
+
+
+@lru_cache(maxsize=32)
+def _options_schema(
+    boost: str,
+    forecast_hours: str,
+    manual_grid_boost: int,
+    history_days: str,
+    min_battery_soc: int,
+    percentile: int,
+) -> vol.Schema:
+    """Return the options schema with these defaults. Cached since the options rarely change.
 
+    The schema is shared, so it must not be modified.
+    """
     return vol.Schema(
         {
             vol.Required("boost", default=boost): vol.In(
@@ -76,7 +101,12 @@ def get_options_schema(options: Mapping[str, Any]) -> vol.Schema:
 
 
 class TOUSchedulerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
-    """Handle a config flow for TOU Scheduler."""
+    """Handle a config flow for TOU Scheduler.
+
+    Home Assistant's flow base classes keep a __dict__, so the slots mostly serve to declare our own fields.
+    """
+
+    __slots__ = ("api_key", "password", "resource_id", "username")
 
     VERSION = 1
 
@@ -121,7 +151,12 @@ class TOUSchedulerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             if self.api_key and self.resource_id:
                 # Test the new credentials
                 timezone = self.hass.config.time_zone or "UTC"
-                solcast = SolcastAPI(self.api_key, self.resource_id, timezone)
+                solcast = SolcastAPI(
+                    self.api_key,
+                    self.resource_id,
+                    timezone,
+                    session=async_get_clientsession(self.hass),
+                )
                 await solcast.refresh_data()
                 if solcast.status == SolcastStatus.UNKNOWN:
                     errors["base"] = "invalid_solcast_auth"
@@ -151,7 +186,7 @@ class TOUSchedulerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         "password": self.password,
                         "api_key": self.api_key,
                         "resource_id": self.resource_id,
-                        "forecast_hours": user_input["solcast_hour"],
+                        "forecast_hours": user_input["forecast_hours"],
                         "manual_grid_boost": user_input["manual_grid_boost"],
                         "history_days": user_input["history_days"],
                         "min_battery_soc": user_input["min_battery_soc"],
@@ -178,6 +213,8 @@ class TOUSchedulerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 class TouSchedulerOptionFlow(config_entries.OptionsFlow):
     """Handle TOU Scheduler options."""
 
+    __slots__ = ()
+
     def __init__(self, config_entry) -> None:
         """Initialize options flow."""
         # self.config_entry = config_entry
@@ -188,32 +225,24 @@ class TouSchedulerOptionFlow(config_entries.OptionsFlow):
         if user_input is not None:
             # Save the user input and update the config entry options, converting the pseudo list to a list
             if not errors:
+                options = {
+                    "manual_grid_boost": user_input["manual_grid_boost"],
+                    "history_days": user_input["history_days"],
+                    "forecast_hours": user_input["forecast_hours"],
+                    "min_battery_soc": user_input["min_battery_soc"],
+                    "percentile": user_input["percentile"],
+                    "boost_mode": user_input["boost"],
+                }
                 # Update the config entry options
                 self.hass.config_entries.async_update_entry(
-                    self.config_entry,
-                    options={
-                        "manual_grid_boost": user_input["manual_grid_boost"],
-                        "history_days": user_input["history_days"],
-                        "forecast_hours": user_input["solcast_hour"],
-                        "min_battery_soc": user_input["min_battery_soc"],
-                        "percentile": user_input["percentile"],
-                        "boost_mode": user_input["boost"],
-                    },
+                    self.config_entry, options=options
                 )
                 # Get the coordinator and request a refresh
-                coordinator = self.hass.data[DOMAIN][self.config_entry.entry_id]
+                coordinator = self.hass.data[DOMAIN][self.config_entry.entry_id][
+                    "coordinator"
+                ]
                 await coordinator.async_request_refresh()
-                return self.async_create_entry(
-                    title="",
-                    data={
-                        "manual_grid_boost": user_input["manual_grid_boost"],
-                        "history_days": user_input["history_days"],
-                        "forecast_hours": user_input["solcast_hour"],
-                        "min_battery_soc": user_input["min_battery_soc"],
-                        "percentile": user_input["percentile"],
-                        "boost_mode": user_input["boost"],
-                    },
-                )
+                return self.async_create_entry(title="", data=options)
 
         return self.async_show_form(
             step_id="init",
@@ -1,5 +1,9 @@
 """Constants for the Tou Scheduler integration."""
 
+from enum import IntEnum
+import os
+from types import MappingProxyType
+
 from aiohttp import ClientTimeout
 
 from homeassistant.const import Platform
@@ -10,29 +14,47 @@ PLATFORMS = [Platform.SENSOR]
 # Version of the Tou Scheduler integration
 VERSION = "0.5.0"
 
-# Turn on integration detailed debugging logging (True)
-DEBUGGING = True
+# Turn on integration detailed debugging logging by starting Home Assistant with TOU_DEBUG=1
+DEBUGGING = os.environ.get("TOU_DEBUG") == "1"
 
 # Define a key for storing the coordinator in hass.data
 COORDINATOR_KEY = "tou_coordinator"
 # Storage keys for the Tou Scheduler data
 SHADE_KEY = "tou_scheduler_storage"
 FORECAST_KEY = "tou_scheduler_forecast"
+SOLCAST_CALLS_KEY = "tou_scheduler_solcast_calls"
 
 # Define Solark data cloud key constants
 CLOUD_URL = "https://solarkcloud.com"
 CLOUD_UPDATE_INTERVAL = 5  # 5 Minutes between updates
+CLOUD_UPDATE_INTERVAL_MAX = 20  # Back off to at most 20 minutes when nothing changes
 API_URL = CLOUD_URL + "/api/v1/"
 
 # Define the common names for the inverter models
-SOLARK_MODEL_TO_NAME = {
+SOLARK_MODEL_TO_NAME = MappingProxyType({
     "STROG INV": "Sol-Ark 12K-2P-N",
-}
+})
 
 # Grid boost off and on, as strings reported back by the cloud
 OFF = "False"
 ON = "True"
 
+
+class BoostMode(IntEnum):
+    """Grid boost modes. str() gives the option value used by the options, services and card."""
+
+    OFF = 0
+    MANUAL = 1
+    AUTOMATIC = 2
+    TESTING = 3
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+# Grid boost option value -> mode
+BOOST_MODE_FROM_STR = {str(mode): mode for mode in BoostMode}
+
 # Default inverter efficiency value is 85%, in case we can't compute it
 DEFAULT_INVERTER_EFFICIENCY = 0.85
 
@@ -43,7 +65,7 @@ SOLCAST_RESOURCE_ID = "resource_id"
 GRID_BOOST_HISTORY = "history_days"
 GRID_BOOST_SOC_HIGH = 60
 GRID_BOOST_ON = "boost_calculation"
-GRID_BOOST_ON_OPTIONS = {"on": "On", "off": "Off"}
+GRID_BOOST_ON_OPTIONS = MappingProxyType({"on": "On", "off": "Off"})
 GRID_BOOST_MIDNIGHT_SOC = "min_battery_soc"
 # GRID_BOOST_STARTING_SOC = "grid_boost_starting_soc"
 SOLCAST_PERCENTILE = "percentile"
@@ -77,23 +99,15 @@ DEFAULT_GRID_BOOST_END = "06:00"
 DEFAULT_SOLCAST_PERCENTILE = 15
 DEFAULT_MANUAL_GRID_BOOST = 50
 DEFAULT_SOLCAST_UPDATE_HOUR = 23
+SOLCAST_DAILY_REQUEST_LIMIT = 8  # Leave headroom under the 10 requests/day hobbyist quota
+SOLCAST_NIGHT_INTERVAL_FACTOR = 4  # Refresh 4 times less often at night than during daylight
+SOLCAST_MAX_ATTEMPTS = 2  # Tries per refresh when Solcast is throttling or having trouble
+SOLCAST_RETRY_RESERVE = 2  # Don't retry once this few requests are left in the daily budget
+SOLCAST_MAX_RETRY_DELAY = 60  # Seconds. Don't hold up the update for longer than this between tries
 DEFAULT_INVERTER_MIN_SOC = 10
 DEFAULT_GRID_BOOST_HISTORY = 3
 
 # Grid boost history strings to make the user interface easier to understand
-GRID_BOOST_HISTORY_OPTIONS = {
-    1: "1 day",
-    2: "2 days",
-    3: "3 days",
-    4: "4 days",
-    5: "5 days",
-    6: "6 days",
-    7: "7 days",
-    8: "8 days",
-    9: "9 days",
-    10: "10 days",
-    11: "11 days",
-    12: "12 days",
-    13: "13 days",
-    14: "14 days",
-}
+GRID_BOOST_HISTORY_OPTIONS = MappingProxyType(
+    {days: f"{days} day{'s' if days > 1 else ''}" for days in range(1, 15)}
+)
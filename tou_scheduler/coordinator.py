@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
 import logging
+import time
+from typing import Any
 
 # from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import CLOUD_UPDATE_INTERVAL, DEBUGGING, DOMAIN
+from .const import (
+    CLOUD_UPDATE_INTERVAL,
+    CLOUD_UPDATE_INTERVAL_MAX,
+    DEBUGGING,
+    DOMAIN,
+)
+from .entity import count_data, parse_percent_data, parse_wh_data, sum_data
 
 # from .tou_scheduler import TOUScheduler
 
@@ -19,6 +28,25 @@ if DEBUGGING:
 else:
     _LOGGER.setLevel(logging.INFO)
 
+# Keys that change on every update (timestamps and values derived from the clock or from other keys), so they
+#  are left out when deciding whether anything was actually measured differently
+_VOLATILE_KEYS = frozenset(
+    {
+        "data_updated",
+        "batt_exhausted",
+        "today_abbrev",
+        "shading_parsed",
+        "shading_count",
+        "load_parsed",
+        "load_sum",
+    }
+)
+
+
+def _measured(data: dict[str, Any] | None) -> dict[str, Any]:
+    """Return the sensor data without the keys that change on every update."""
+    return {key: value for key, value in (data or {}).items() if key not in _VOLATILE_KEYS}
+
 
 class TOUUpdateCoordinator(DataUpdateCoordinator):
     """Get the current data to update the sensors."""
@@ -34,16 +62,77 @@ class TOUUpdateCoordinator(DataUpdateCoordinator):
             name=DOMAIN,
             update_method = update_method,
             update_interval=timedelta(minutes=CLOUD_UPDATE_INTERVAL),
+            # Skip the listener callbacks when the new data equals the previous data
+            always_update=False,
         )
         # self.entry = entry
         # self.tou_scheduler = tou_scheduler
+        # Serialize updates so overlapping refreshes share one trip to the clouds
+        self._update_lock = asyncio.Lock()
+        self._last_result: dict[str, Any] | None = None
+        self._last_ts: float = 0.0
 
     async def _async_update_data(self):
-        """Fetch all data for your sensors here."""
+        """Fetch all data for your sensors here.
+
+        If another update finished while this one waited for the lock, its result is
+        reused instead of fetching the same data again.
+        """
+        requested = time.monotonic()
+        async with self._update_lock:
+            if self._last_result is not None and self._last_ts >= requested:
+                return self._last_result
+            data = await self._async_fetch_data()
+            self._last_result = data
+            self._last_ts = time.monotonic()
+            return data
+
+    async def _async_fetch_data(self):
+        """Call the update method and add the parsed hourly tables."""
         if self.update_method:
             try:
-                return self.update_method()
+                data = await self.update_method()
             except Exception as e:
                 _LOGGER.error("Failed to update sensors: %s", e)
+                self._adapt_update_interval(changed=False)
                 raise UpdateFailed(f"Failed to update sensors: {e}") from e
+            return self._add_parsed_tables(data)
         return None
+
+    def _add_parsed_tables(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Add the parsed hourly tables to the sensor data, and adapt the update interval to any change."""
+        # Parse the hourly tables once here so every entity can share the results
+        shading = data.get("shading", {})
+        load = data.get("load", {})
+        data["shading_parsed"] = parse_percent_data(shading)
+        data["shading_count"] = count_data(shading)
+        data["load_parsed"] = parse_wh_data(load)
+        data["load_sum"] = sum_data(load)
+        # Fallback label for the shading and load entities when they have no data
+        data["today_abbrev"] = datetime.now().strftime("%a")
+        self._adapt_update_interval(changed=_measured(data) != _measured(self.data))
+        return data
+
+    @callback
+    def async_publish(self, data: dict[str, Any]) -> None:
+        """Push sensor data that was just computed, rather than fetching it again with a refresh.
+
+        This also restarts the wait for the next scheduled refresh.
+        """
+        data = self._add_parsed_tables(data)
+        self._last_result = data
+        self._last_ts = time.monotonic()
+        self.async_set_updated_data(data)
+
+    def _adapt_update_interval(self, changed: bool) -> None:
+        """Poll at the normal rate after a change, and back off while nothing changes.
+
+        The new interval is picked up when the coordinator schedules the next refresh.
+        """
+        if changed:
+            self.update_interval = timedelta(minutes=CLOUD_UPDATE_INTERVAL)
+        else:
+            self.update_interval = min(
+                2 * (self.update_interval or timedelta(minutes=CLOUD_UPDATE_INTERVAL)),
+                timedelta(minutes=CLOUD_UPDATE_INTERVAL_MAX),
+            )
@@ -9,17 +9,19 @@ Each entity class represents a different aspect of the TOU Scheduler that is of
 """
 
 import datetime
+from functools import lru_cache
 import logging
-import re
+import math
 from typing import Any
 
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
 )
 
-from .const import DEBUGGING, DOMAIN
+from .const import DEBUGGING
 
 logger = logging.getLogger(__name__)
 if DEBUGGING:
@@ -28,6 +30,12 @@ else:
     logger.setLevel(logging.INFO)
 
 
+# Printable 12-hour strings with 'am' or 'pm' suffix, indexed by the hour (0-23)
+_HOUR_STRINGS: tuple[str, ...] = tuple(
+    f"{(hour % 12) or 12}{' am' if hour < 12 else ' pm'}" for hour in range(24)
+)
+
+
 # Helper functions
 def printable_hour(hour: int) -> str:
     """Return a printable hour string in 12-hour format with 'am' or 'pm' suffix.
@@ -39,115 +47,126 @@ def printable_hour(hour: int) -> str:
         Formatted string in 12-hour format with am/pm.
 
     """
-    return f"{(hour % 12) or 12}" f"{' am' if hour < 12 else ' pm'}"
+    return _HOUR_STRINGS[hour]
 
 
-def parse_percent_data(input_str: str) -> dict[str, str]:
-    """Convert a string representation of a dictionary to an actual dictionary.
+def parse_percent_data(hours: dict[int, float]) -> dict[str, str]:
+    """Convert an hourly ratio dictionary to printable percentages.
 
     Args:
-        input_str: String representation of a dictionary.
+        hours: Dictionary with integer hour keys and float ratio values.
 
     Returns:
-        A dictionary with integer keys and float values.
+        A dictionary with printable hour keys and percentage string values.
+        The dictionary is cached and shared, so it must not be modified.
 
     """
-    # Remove the curly braces
-    input_str = input_str.strip("{}")
-    # Split the string into key-value pairs
-    pairs = re.split(r",\s*(?![^{}]*\})", input_str)
-    result = {}
-    for pair in pairs:
-        # Split each pair into key and value
-        key, value = pair.split(":")
-        # Convert key and value to appropriate types and add to the dictionary
-        result[printable_hour(int(key.strip()))] = f"{100 * float(value.strip()):.0f}%"
-    return result
-
-
-def parse_wh_data(input_str: str) -> dict[str, str]:
-    """Convert a string representation of a dictionary to an actual dictionary.
+    return _format_percent(tuple(hours.items()))
+
+
+def parse_wh_data(hours: dict[int, float]) -> dict[str, str]:
+    """Convert an hourly energy dictionary to printable watt-hours.
 
     Args:
-        input_str: String representation of a dictionary.
+        hours: Dictionary with integer hour keys and float wH values.
 
     Returns:
-        A dictionary with integer keys and float values.
+        A dictionary with printable hour keys and wH string values.
+        The dictionary is cached and shared, so it must not be modified.
 
     """
-    # Remove the curly braces
-    input_str = input_str.strip("{}")
-    if input_str == "":
-        return {}
-    # Split the string into key-value pairs
-    pairs = re.split(r",\s*(?![^{}]*\})", input_str)
-    result = {}
-    for pair in pairs:
-        # Split each pair into key and value
-        key, value = pair.split(":")
-        # Convert key and value to appropriate types and add to the dictionary
-        result[printable_hour(int(key.strip()))] = f"{float(value.strip()):,.0f} wH"
-    return result
-
-
-def count_data(input_str: str) -> int:
-    """Convert a string representation of a dictionary to an actual dictionary.
+    return _format_wh(tuple(hours.items()))
+
+
+@lru_cache(maxsize=32)
+def _format_percent(items: tuple[tuple[int, float], ...]) -> dict[str, str]:
+    """Format (hour, ratio) pairs as percentages. Cached since shading rarely changes."""
+    return {_HOUR_STRINGS[hour]: f"{100 * value:.0f}%" for hour, value in items}
+
+
+@lru_cache(maxsize=32)
+def _format_wh(items: tuple[tuple[int, float], ...]) -> dict[str, str]:
+    """Format (hour, wH) pairs as watt-hours. Cached since load averages rarely change."""
+    return {_HOUR_STRINGS[hour]: f"{value:,.0f} wH" for hour, value in items}
+
+
+def count_data(hours: dict[int, float]) -> int:
+    """Count the hours with a positive value.
 
     Args:
-        input_str: String representation of a dictionary.
+        hours: Dictionary with integer hour keys and float values.
 
     Returns:
-        A dictionary with integer keys and float values.
+        The number of hours with a value greater than zero.
 
     """
-    # Remove the curly braces
-    input_str = input_str.strip("{}")
-    # Split the string into key-value pairs
-    pairs = re.split(r",\s*(?![^{}]*\})", input_str)
-    result = 0
-    for pair in pairs:
-        # Split each pair into key and value
-        key, value = pair.split(":")
-        # Convert key and value to appropriate types and add to the dictionary
-        if float(value.strip()) > 0.0:
-            result += 1
-    return result
-
-
-def sum_data(input_str: str) -> int:
-    """Convert a string representation of a dictionary to an actual dictionary.
+    return sum(1 for value in hours.values() if value > 0.0)
+
+
+def sum_data(hours: dict[int, float]) -> int:
+    """Sum the hourly values.
 
     Args:
-        input_str: String representation of a dictionary.
+        hours: Dictionary with integer hour keys and float values.
 
     Returns:
-        A dictionary with integer keys and float values.
+        The rounded total of all hourly values.
 
     """
-    # Remove the curly braces
-    input_str = input_str.strip("{}")
-    logger.debug("sum_data: input_str: %s", input_str)
-    # Check for empty data
-    if input_str == "":
-        return 0
-    # Split the string into key-value pairs
-    pairs = re.split(r",\s*(?![^{}]*\})", input_str)
-    result = 0.0
-    for pair in pairs:
-        # Split each pair into key and value
-        key, value = pair.split(":")
-        # Convert key and value to appropriate types and add to the dictionary
-        result += float(value.strip())
-    return int(round(result, 0))
-
-
-class TOUSchedulerEntity(CoordinatorEntity):
+    logger.debug("sum_data: hours: %s", hours)
+    return int(round(math.fsum(hours.values()), 0))
+
+
+class TOUCachedEntity(CoordinatorEntity):
+    """Base class for the TOU Scheduler entities.
+
+    The state and the extra state attributes are computed once per coordinator update
+    and stored in _attr_state and _attr_extra_state_attributes, so Home Assistant reads
+    them without calling any of our code. The state is only written when something
+    actually changed.
+
+    The _attr_* fields are left out of __slots__ because Home Assistant's entity
+    metaclass manages them. Its base classes keep a __dict__, so the slots mostly
+    serve to declare our own fields.
+    """
+
+    __slots__ = ("_coordinator", "_key", "_written_available")
+
+    def __init__(self, coordinator, context=None) -> None:
+        """Initialize the entity with no availability written yet."""
+        super().__init__(coordinator, context)
+        self._written_available: bool | None = None
+
+    def _refresh_cache(self) -> None:
+        """Recompute the state and attributes from the coordinator data."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update the state and attributes, and write them only if they or the availability changed.
+
+        The coordinator has already updated last_update_success when this is called, so the availability
+        is compared with the last one written rather than read before the update.
+        """
+        previous = (self.state, self.extra_state_attributes)
+        self._refresh_cache()
+        if (
+            self.state,
+            self.extra_state_attributes,
+        ) != previous or self.available != self._written_available:
+            self._written_available = self.available
+            self.async_write_ha_state()
+
+
+class TOUSchedulerEntity(TOUCachedEntity):
     """Class for TOU Scheduler entity."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         entry_id: str,
         coordinator: DataUpdateCoordinator[dict[str, Any]],
+        device_info: DeviceInfo,
         # parent: str,
     ) -> None:
         """Initialize the sensor."""
@@ -160,48 +179,33 @@ class TOUSchedulerEntity(CoordinatorEntity):
         self._attr_unique_id = f"{entry_id}_{self._key}"
         self._attr_icon = "mdi:toggle-switch"
         self._attr_name = f"{plant_name} ToU {im_a}"
-        self._device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry_id)},
-            name=self._attr_name,
-        )
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Return the extra state attributes."""
-        forecast = round(self.coordinator.data.get("day_forecast", 0.0), 1)
-        forecast_value = f"{forecast} kWh"
-        soc = self.coordinator.data.get("batt_soc", 0)
-        soc_value = f"{int(soc)}%" if soc else "Unknown"
-        return {
-            "plant_name": self.coordinator.data.get("plant_name", "Plant name n/a"),
-            "battery_soc": soc_value,
-            "day_forecast": forecast_value,
-            "inverter_model": self.coordinator.data.get(
-                "inverter_model", "Inverter model n/a"
-            ),
-            "cloud_token_refresh": self.coordinator.data.get(
-                "bearer_token_expires_on", "Unknown"
-            ),
-            "cloud_status": self.coordinator.data.get("cloud_status", "Unknown"),
-            "plant_status": self.coordinator.data.get(
-                "plant_status", "Plant status n/a"
-            ),
-            "plant_image_url": self.coordinator.data.get(
-                "plant_image_url", ""
-            ),
-            "plant_created": self.coordinator.data.get(
-                "plant_created", "Plant created time n/a"
-            ),
-            "inverter_status": self.coordinator.data.get(
-                "inverter_status", "Inverter status n/a"
-            ),
-            "manual": self.coordinator.data.get("manual_grid_boost", 30),
-            "calculated": self.coordinator.data.get("calculated_boost", 20),
-            "confidence": self.coordinator.data.get("confidence", 10),
-            "min_soc": self.coordinator.data.get("min_soc", 20),
-            "load_days": self.coordinator.data.get("load_days", 3),
-            "update_hour": self.coordinator.data.get("update_hour", 3),
+        self._attr_device_info = device_info
+        self._refresh_cache()
+
+    def _refresh_cache(self) -> None:
+        """Compute the scheduler state and attributes."""
+        get = self.coordinator.data.get
+        forecast = round(get("day_forecast", 0.0), 1)
+        soc = get("batt_soc", 0)
+        self._attr_extra_state_attributes = {
+            "plant_name": get("plant_name", "Plant name n/a"),
+            "battery_soc": f"{int(soc)}%" if soc else "Unknown",
+            "day_forecast": f"{forecast} kWh",
+            "inverter_model": get("inverter_model", "Inverter model n/a"),
+            "cloud_token_refresh": get("bearer_token_expires_on", "Unknown"),
+            "cloud_status": get("cloud_status", "Unknown"),
+            "plant_status": get("plant_status", "Plant status n/a"),
+            "plant_image_url": get("plant_image_url", ""),
+            "plant_created": get("plant_created", "Plant created time n/a"),
+            "inverter_status": get("inverter_status", "Inverter status n/a"),
+            "manual": get("manual_grid_boost", 30),
+            "calculated": get("calculated_boost", 20),
+            "confidence": get("confidence", 10),
+            "min_soc": get("min_soc", 20),
+            "load_days": get("load_days", 3),
+            "update_hour": get("update_hour", 3),
         }
+        self._attr_state = get("grid_boost_mode", "State unknown")
 
     @property
     def name(self) -> str | None:
@@ -213,13 +217,8 @@ class TOUSchedulerEntity(CoordinatorEntity):
         """Return a unique ID."""
         return self._attr_unique_id
 
-    @property
-    def state(self) -> str:
-        """Return the state of the sensor."""
-        return self.coordinator.data.get("grid_boost_mode", "State unknown")
-
 
-class ShadingEntity(CoordinatorEntity):
+class ShadingEntity(TOUCachedEntity):
     """Representation of a Shading.
 
     This sensor is used to display the shading ratio for each hour of the day if available.
@@ -227,10 +226,13 @@ class ShadingEntity(CoordinatorEntity):
     If we are unable to get the shading ratio, the sensor will display "No shading percentages available".
     """
 
+    __slots__ = ("_count",)
+
     def __init__(
         self,
         entry_id: str,
         coordinator: DataUpdateCoordinator[dict[str, Any]],
+        device_info: DeviceInfo,
         # parent: str,
     ) -> None:
         """Initialize the sensor."""
@@ -244,10 +246,24 @@ class ShadingEntity(CoordinatorEntity):
         self._attr_icon = "mdi:toggle-switch"
         self._attr_name = f"{plant_name} ToU {im_a}"
         self._count: int = 0
-        self._device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry_id)},
-            name=self._attr_name,
-        )
+        self._attr_device_info = device_info
+        self._refresh_cache()
+
+    def _refresh_cache(self) -> None:
+        """Compute the shading state and the hourly shade values."""
+        hours: dict[str, str] = self._coordinator.data.get("shading_parsed", {})
+        if not hours:
+            hours = {"No shading found": self._coordinator.data.get("today_abbrev", "")}
+        self._attr_extra_state_attributes = hours
+
+        # Count of the hours with shading (computed by the coordinator)
+        self._count = self._coordinator.data.get("shading_count", 0)
+        if self._count == 1:
+            self._attr_state = "1 hour with shading"
+        elif self._count > 0:
+            self._attr_state = f"{self._count} hours with shading"
+        else:
+            self._attr_state = "No shading found"
 
     @property
     def name(self) -> str | None:
@@ -259,44 +275,20 @@ class ShadingEntity(CoordinatorEntity):
         """Return a unique ID."""
         return self._attr_unique_id
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return self._device_info
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Return the hourly shade values as dict[str,str]."""
-        hours_str = self._coordinator.data.get("shading", "{}")
-        hours: dict[str, str] = parse_percent_data(hours_str)
-        if not hours:
-            day = datetime.datetime.now().strftime("%a")
-            return {"No shading found": day}
-        return hours
 
-    @property
-    def state(self) -> str | int | float | None:
-        """Return the count of hours with shading."""
-        hours_str = self._coordinator.data.get("shading", "{}")
-        # Count the number of hours with shading
-        count: int = count_data(hours_str)
-        if count == 1:
-            return "1 hour with shading"
-        if count > 0:
-            return f"{count} hours with shading"
-        return "No shading found"
-
-
-class LoadEntity(CoordinatorEntity):
+class LoadEntity(TOUCachedEntity):
     """Representation of the average daily load.
 
     This sensor is used to display the average daily load for each hour of the day if available.
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         entry_id: str,
         coordinator: DataUpdateCoordinator[dict[str, Any]],
+        device_info: DeviceInfo,
         # parent: str,
     ) -> None:
         """Initialize the sensor."""
@@ -309,10 +301,17 @@ class LoadEntity(CoordinatorEntity):
         self._attr_unique_id = f"{entry_id}_{self._key}"
         self._attr_icon = "mdi:toggle-switch"
         self._attr_name = f"{plant_name} ToU {im_a}"
-        self._device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry_id)},
-            name=self._attr_name,
-        )
+        self._attr_device_info = device_info
+        self._refresh_cache()
+
+    def _refresh_cache(self) -> None:
+        """Compute the daily load state and the hourly load values."""
+        hours: dict[str, str] = self._coordinator.data.get("load_parsed", {})
+        if not hours:
+            hours = {"No load averages found": self._coordinator.data.get("today_abbrev", "")}
+        self._attr_extra_state_attributes = hours
+        load_sum: int = self._coordinator.data.get("load_sum", 0)
+        self._attr_state = f"{round(load_sum / 1000, 1)} kWh"
 
     @property
     def name(self) -> str | None:
@@ -324,41 +323,20 @@ class LoadEntity(CoordinatorEntity):
         """Return a unique ID."""
         return self._attr_unique_id
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return self._device_info
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Return the hourly load values as dict[str,str]."""
-        hours_str: str = self._coordinator.data.get("load", "{}")
-        hours: dict[str, str] = parse_wh_data(hours_str)
-
-        if not hours:
-            day = datetime.datetime.now().strftime("%a")
-            return {"No load averages found": day}
-        return hours
-
-    @property
-    def state(self) -> str | int | float | None:
-        """Return the state of the sensor."""
-        hours_str: str = self._coordinator.data.get("load", "{}")
-        load = round(sum_data(hours_str) / 1000, 1)
-
-        return f"{load} kWh"
-
 
-class BatteryLifeEntity(CoordinatorEntity):
+class BatteryLifeEntity(TOUCachedEntity):
     """Representation of the average daily load.
 
     This sensor is used to display the average daily load for each hour of the day if available.
     """
 
+    __slots__ = ("_last_eol",)
+
     def __init__(
         self,
         entry_id: str,
         coordinator: DataUpdateCoordinator[dict[str, Any]],
+        device_info: DeviceInfo,
         # parent: str,
     ) -> None:
         """Initialize the sensor."""
@@ -371,10 +349,18 @@ class BatteryLifeEntity(CoordinatorEntity):
         self._attr_unique_id = f"{entry_id}_{self._key}"
         self._attr_icon = "mdi:clock-alert"
         self._attr_name = "Battery empty at"
-        self._device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry_id)},
-            name=self._attr_name,
-        )
+        self._attr_device_info = device_info
+        self._last_eol: datetime.datetime | None = None
+        self._refresh_cache()
+
+    def _refresh_cache(self) -> None:
+        """Compute the battery exhausted time, reformatting only when it changes."""
+        eol = self._coordinator.data.get("batt_exhausted") or datetime.datetime.now()
+        if eol == self._last_eol:
+            return
+        self._last_eol = eol
+        # Strip the hour's leading zero by hand since %-I is not portable
+        self._attr_state = f"{eol:%a} {eol.strftime('%I:%M %p').lstrip('0')}"
 
     @property
     def name(self) -> str | None:
@@ -386,28 +372,17 @@ class BatteryLifeEntity(CoordinatorEntity):
         """Return a unique ID."""
         return self._attr_unique_id
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        return self._device_info
-
-    @property
-    def state(self) -> str | int | float | None:
-        """Return the state of the sensor."""
-        eol: str = self._coordinator.data.get(
-            "batt_exhausted", datetime.datetime.now().timestamp()
-        ).strftime("%a %-I:%M %p")
 
-        return eol
-
-
-class TOUBoostEntity(CoordinatorEntity):
+class TOUBoostEntity(TOUCachedEntity):
     """Class for TOU Scheduler entity."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         entry_id: str,
         coordinator: DataUpdateCoordinator[dict[str, Any]],
+        device_info: DeviceInfo,
         # parent: str,
     ) -> None:
         """Initialize the sensor."""
@@ -420,22 +395,21 @@ class TOUBoostEntity(CoordinatorEntity):
         self._attr_unique_id = f"{entry_id}_{self._key}"
         self._attr_icon = "mdi:toggle-switch"
         self._attr_name = f"{plant_name} ToU {im_a}"
-        self._device_info = DeviceInfo(
-            identifiers={(DOMAIN, entry_id)},
-            name=self._attr_name,
-        )
-
-    @property
-    def extra_state_attributes(self) -> dict[str, str]:
-        """Return the extra state attributes."""
-        return {
-            "mode": self.coordinator.data.get("grid_boost_mode", 20),
-            "calculated": self.coordinator.data.get("calculated_boost", 20),
-            "confidence": self.coordinator.data.get("confidence", 10),
-            "min_soc": self.coordinator.data.get("min_soc", 20),
-            "load_days": self.coordinator.data.get("load_days", 3),
-            "update_hour": self.coordinator.data.get("forecast_hour", 23),
+        self._attr_device_info = device_info
+        self._refresh_cache()
+
+    def _refresh_cache(self) -> None:
+        """Compute the boost state and attributes."""
+        get = self.coordinator.data.get
+        self._attr_extra_state_attributes = {
+            "mode": get("grid_boost_mode", 20),
+            "calculated": get("calculated_boost", 20),
+            "confidence": get("confidence", 10),
+            "min_soc": get("min_soc", 20),
+            "load_days": get("load_days", 3),
+            "update_hour": get("forecast_hour", 23),
         }
+        self._attr_state = get("manual_boost", 30)
 
     @property
     def name(self) -> str | None:
@@ -446,8 +420,3 @@ class TOUBoostEntity(CoordinatorEntity):
     def unique_id(self) -> str | None:
         """Return a unique ID."""
         return self._attr_unique_id
-
-    @property
-    def state(self) -> str:
-        """Return the state of the sensor."""
-        return self.coordinator.data.get("manual_boost", 30)
@@ -1,5 +1,6 @@
 """Sensor platform for the TOU Scheduler integration."""
 
+from itertools import chain
 import logging
 
 from homeassistant.components.sensor import (
@@ -12,9 +13,9 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfPower
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo  # Correct import
-from homeassistant.helpers.entity import generate_entity_id
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import slugify
 
 from .const import DEBUGGING, DOMAIN
 from .coordinator import TOUUpdateCoordinator
@@ -161,6 +162,11 @@ async def async_setup_entry(
         return
     unique_prefix = f"{plant_id}_tou"
     parent = f"{unique_prefix}_scheduler"
+    # All entities belong to the same device, so they share one DeviceInfo
+    device_info = DeviceInfo(
+        identifiers={(DOMAIN, unique_prefix)},
+        name=coordinator.data.get("plant_name", "My plant"),
+    )
 
     # Add special entity sensors: Scheduler, Battery, Cloud, Plant, Inverter, Shading and Load (from entity.py)
     entity_list = [
@@ -171,10 +177,9 @@ async def async_setup_entry(
         TOUBoostEntity,
     ]
     entities = [
-        entity(entry_id=unique_prefix, coordinator=coordinator)
+        entity(entry_id=unique_prefix, coordinator=coordinator, device_info=device_info)
         for entity in entity_list
     ]
-    async_add_entities(entities)
 
     # Add the "normal" Sol-Ark sensors for the inverter (from this file)
     sensors = [
@@ -182,16 +187,20 @@ async def async_setup_entry(
             entry_id=unique_prefix,
             coordinator=coordinator,
             parent=parent,
+            device_info=device_info,
             description=entity_description,
         )
         for entity_description in TOU_SENSOR_ENTITIES.values()
     ]
-    async_add_entities(sensors)
+    # Register everything in one pass through the entity platform
+    async_add_entities(chain(entities, sensors))
 
 
 class OhSnytSensor(CoordinatorEntity[TOUUpdateCoordinator], SensorEntity):
     """Representation of a standard sensor."""
 
+    __slots__ = ("_key",)
+
     has_entity_name = False  # Prevent Home Assistant from generating a friendly name
 
     def __init__(
@@ -200,6 +209,7 @@ class OhSnytSensor(CoordinatorEntity[TOUUpdateCoordinator], SensorEntity):
         entry_id: str,
         parent: str,
         coordinator: TOUUpdateCoordinator,
+        device_info: DeviceInfo,
         description: OhSnytSensorEntityDescription,
     ) -> None:
         """Initialize the sensor."""
@@ -214,14 +224,10 @@ class OhSnytSensor(CoordinatorEntity[TOUUpdateCoordinator], SensorEntity):
         self._attr_native_unit_of_measurement = description.native_unit_of_measurement
         self._attr_device_class = description.device_class
         self._attr_state_class = description.state_class
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, entry_id)},
-            "name": self._attr_name,
-            # via_device=(DOMAIN, parent) if parent else ("", ""),
-        }
-        self.entity_id = generate_entity_id(
-            "sensor.{}", self._attr_unique_id, hass=coordinator.hass
-        )
+        self._attr_device_info = device_info
+        # unique_id is already unique, so slug it directly rather than
+        # searching the registry for a free entity_id
+        self.entity_id = f"sensor.{slugify(self._attr_unique_id)}"
         # logger.debug(
         #     "\n++Created sensor: %s. Native value is: %s %s. (entity_id: %s, _attr_unique_id: %s)",
         #     self._attr_name,
@@ -234,7 +240,7 @@ class OhSnytSensor(CoordinatorEntity[TOUUpdateCoordinator], SensorEntity):
     @property
     def name(self) -> str | None:
         """Return the name of the sensor."""
-        if self.entity_description.key == "grid_boost_soc":
+        if self._key == "grid_boost_soc":
             day = self.coordinator.data.get("grid_boost_day")
             if day:
                 return f"{self._attr_name or ''} ({day})"
@@ -248,13 +254,5 @@ class OhSnytSensor(CoordinatorEntity[TOUUpdateCoordinator], SensorEntity):
     @property
     def native_value(self) -> str | int | float | None:
         """Return the state of the sensor."""
-        value = self.coordinator.data.get(self.entity_description.key)
-        if not isinstance(value, (int, float, type(None))):
-            logger.error("Invalid type for native_value: %s (%s)", value, type(value))
-            return None
-        return value if isinstance(value, float) else value
+        return self.coordinator.data.get(self._key)
 
-    @property
-    def device_info(self) -> DeviceInfo | None:
-        """Return the device info."""
-        return self._attr_device_info
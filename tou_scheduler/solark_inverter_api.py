@@ -1,8 +1,11 @@
 """Contains the classes for a Sol-Ark Cloud data integration."""
 
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from enum import Enum
-import json
+from enum import Enum, IntEnum
+from functools import cached_property
 import logging
 from typing import Any
 from zoneinfo import ZoneInfo
@@ -10,12 +13,13 @@ from zoneinfo import ZoneInfo
 import aiohttp
 from aiohttp import ClientSession
 from dateutil.relativedelta import relativedelta
+import orjson
 from requests.exceptions import HTTPError
+from yarl import URL
 
 from .const import (
     API_URL,
     CLOUD_URL,
-    DEBUGGING,
     DEFAULT_BATTERY_SHUTDOWN,
     DEFAULT_GRID_BOOST,
     DEFAULT_GRID_BOOST_END,
@@ -24,13 +28,38 @@ from .const import (
     DEFAULT_INVERTER_EFFICIENCY,
     DEFAULT_MANUAL_GRID_BOOST,
     TIMEOUT,
+    BoostMode,
 )
 
+# The level is left to Home Assistant's logger configuration
 logger = logging.getLogger(__name__)
-if DEBUGGING:
-    logger.setLevel(logging.DEBUG)
-else:
-    logger.setLevel(logging.INFO)
+
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    """Convert a cloud value to float, returning the default if it is missing or not a number."""
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _loads(body: bytes) -> Any:
+    """Decode a JSON response body, returning None if it is not valid JSON."""
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize request bodies with orjson (aiohttp expects a str)."""
+    return orjson.dumps(obj).decode()
 
 
 class InverterAPI:
@@ -52,6 +81,26 @@ class InverterAPI:
             e) write grid boost state of charge settings to the inverter.
     """
 
+    # Endpoints that depend on the plant and inverter, built after authentication
+    _URL_TEMPLATES: tuple[tuple[str, str], ...] = (
+        ("flow", "/api/v1/plant/energy/{plant}/flow"),
+        ("read_settings", "/api/v1/common/setting/{sn}/read"),
+        ("write_settings", "/api/v1/common/setting/{sn}/set"),
+        ("battery", "/api/v1/inverter/battery/{sn}/realtime?sn={sn}&lan=en"),
+        ("pv", "/api/v1/inverter/{sn}/realtime/input"),
+        ("grid", "/api/v1/inverter/grid/{sn}/realtime?sn={sn}&lan=en"),
+        ("load", "/api/v1/inverter/load/{sn}/realtime"),
+    )
+    # Grid boost mode -> (Time of Use block 1 SoC, block 1 enabled). Testing writes nothing.
+    _BOOST_MODES: dict[BoostMode, Callable[["InverterAPI"], tuple[str, bool]]] = {
+        # A manual boost sets the SoC to the manual boost value
+        BoostMode.MANUAL: lambda api: (str(api.manual_grid_boost), True),
+        # The automatic calculated boost sets the SoC to the calculated value
+        BoostMode.AUTOMATIC: lambda api: (str(api.calculated_grid_boost), True),
+        # Turning off the boost sets the SoC to 0
+        BoostMode.OFF: lambda api: ("0", False),
+    }
+
     # Class initialization, getters and setters, and string representation
     def __init__(self, username: str, password: str, timezone: str) -> None:
         """Sol-Ark data cloud object."""
@@ -60,25 +109,30 @@ class InverterAPI:
         self._username: str = username
         self._password: str = password
         self.timezone: str = timezone
+        self._tz = ZoneInfo(timezone)
         self._refresh_token: str | None = None
         self._bearer_token: str | None = None
-        self.bearer_token_expires_on: datetime = datetime.now(ZoneInfo(timezone))
+        self.bearer_token_expires_on: datetime
+        self._reauth_at: datetime
+        self._reauth_log_at: datetime
+        self._set_token_expiry(None)
 
-        # Here is the session headers we use to communicate with the cloud
+        # Here is the session headers we use to communicate with the cloud. The
+        # Authorization header is added to the session once we have a token.
         self._headers = {
             "Content-type": "application/json",
             "Accept": "application/json",
-            "Authorization": "",
         }
 
         # General cloud info
         self.cloud_status = Cloud_Status.UNKNOWN
-        self.data_updated: str = ""
-        self._urls = {
-            "auth": CLOUD_URL + "/oauth/token",
-            "plant_list": API_URL + "plants?page=1&limit=10&name=&status=",
-            "inverter_list": CLOUD_URL
-            + "/api/v1/inverters?page=1&limit=10&type=-1&status=1",
+        # URLs are parsed once here, so aiohttp does not reparse them on every request
+        self._urls: dict[str, URL] = {
+            "auth": URL(CLOUD_URL + "/oauth/token"),
+            "plant_list": URL(API_URL + "plants?page=1&limit=10&name=&status="),
+            "inverter_list": URL(
+                CLOUD_URL + "/api/v1/inverters?page=1&limit=10&type=-1&status=1"
+            ),
             # Other urls will be added later after the plant is selected
         }
 
@@ -89,9 +143,8 @@ class InverterAPI:
         self.plant_status: Plant = Plant.UNKNOWN
         self.plant_image_url: str | None = None
         self.efficiency: float = DEFAULT_INVERTER_EFFICIENCY
-        self._efficiency_update_month = (
-            datetime.now(ZoneInfo(timezone)) - relativedelta(months=1)
-        ).month
+        # Calculate the efficiency on the first refresh, then once a month
+        self._efficiency_next_check: datetime = datetime.now(self._tz)
         self.plant_name: str | None = None
         # Here is the inverter info
         self.inverter_model: str | None = None
@@ -107,7 +160,6 @@ class InverterAPI:
         self.calculated_grid_boost: int = DEFAULT_GRID_BOOST_STARTING_SOC
 
         # Here is the battery info
-        self.batt_wh_usable: int = 0  # Current battery charge in Wh
         self.grid_boost_wh_min: int = (
             0  # Minimum battery charge in Wh during grid boost time
         )
@@ -115,18 +167,22 @@ class InverterAPI:
         self.batt_shutdown: int = DEFAULT_BATTERY_SHUTDOWN  # Battery shutdown SoC
         self.batt_low_warning: int = DEFAULT_BATTERY_SHUTDOWN + 5
 
-        # Realtime power in and out. Shown in kW
-        self.realtime_battery_soc = 0.0
-        self.realtime_battery_power = 0.0
-        self.realtime_grid_power = 0.0
-        self.realtime_load_power = 0.0
-        self.realtime_pv_power = 0.0
+        # Realtime power in and out, usable battery charge and when they were read
+        self.realtime = RealtimeSnapshot()
 
         # self.batt_soc: float = 0.0
         self._batt_wh_max_est: float = 0.0
 
-        # Temporary counter for reauthentication log
-        self._reauth_counter = 0
+        # One session is shared by all requests so connections are kept alive
+        self._session: ClientSession | None = None
+        # Requests may run concurrently, so only one of them may renew the token
+        self._auth_lock = asyncio.Lock()
+        # Last body, decoded data and ETag for the GETs we poll, so unchanged responses
+        # skip decoding, and the flow and settings data last applied to our values
+        self._get_cache: dict[URL, tuple[bytes, dict[str, Any] | None]] = {}
+        self._etags: dict[URL, str] = {}
+        self._flow_data: dict[str, Any] | None = None
+        self._settings_data: dict[str, Any] | None = None
 
     @property
     def username(self) -> str | None:
@@ -148,46 +204,128 @@ class InverterAPI:
         """Set the password."""
         self._password = value
 
+    # Read-only views of the realtime snapshot under their older names
+    @property
+    def realtime_battery_soc(self) -> float:
+        """Return the battery state of charge."""
+        return self.realtime.battery_soc
+
+    @property
+    def realtime_battery_power(self) -> float:
+        """Return the power from (to) the battery."""
+        return self.realtime.battery_power
+
+    @property
+    def realtime_grid_power(self) -> float:
+        """Return the power from (to) the grid."""
+        return self.realtime.grid_power
+
+    @property
+    def realtime_load_power(self) -> float:
+        """Return the power to the load."""
+        return self.realtime.load_power
+
+    @property
+    def realtime_pv_power(self) -> float:
+        """Return the power from PV."""
+        return self.realtime.pv_power
+
+    @property
+    def batt_wh_usable(self) -> int:
+        """Return the current usable battery charge in Wh."""
+        return self.realtime.batt_wh_usable
+
+    @property
+    def data_updated(self) -> str:
+        """Return when the realtime data was last read."""
+        return self.realtime.updated
+
+    # Dates formatted for the sensors. They rarely change, so they are cached until they are set again.
+    @cached_property
+    def plant_created_date(self) -> str:
+        """Return the date the plant was created."""
+        return str(self.plant_created.date()) if self.plant_created else "unknown"
+
+    @cached_property
+    def bearer_token_expires_date(self) -> str:
+        """Return the date the bearer token expires."""
+        expires = getattr(self, "bearer_token_expires_on", None)
+        return str(expires.date()) if expires else "unknown"
+
+    @cached_property
+    def sensor_identity(self) -> dict[str, str]:
+        """Return the plant and inverter identity for the sensors, with defaults for anything missing.
+
+        The dictionary is cached and shared, so it must not be modified.
+        """
+        return {
+            "inverter_model": self.inverter_model or "unknown",
+            "inverter_serial_number": self.inverter_serial_number or "unknown",
+            "plant_id": self.plant_id or "unknown",
+            "plant_name": self.plant_name or "unknown",
+            "plant_image_url": self.plant_image_url or "",
+        }
+
     def __str__(self) -> str:
         """Return a string representation of the cloud."""
         return f"Cloud(url={CLOUD_URL}, selected plant={self.plant_id}, updated={self.data_updated})"
 
     # Private helper methods
+    def _get_session(self) -> ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            headers = dict(self._headers)
+            if self._bearer_token:
+                headers["Authorization"] = f"Bearer {self._bearer_token}"
+            self._session = ClientSession(
+                headers=headers,
+                # A single cloud host polled every few minutes: keep its address and
+                # connections around between polls
+                connector=aiohttp.TCPConnector(
+                    use_dns_cache=True,
+                    ttl_dns_cache=600,
+                    limit=8,
+                    limit_per_host=4,
+                    keepalive_timeout=120,
+                ),
+                timeout=TIMEOUT,
+                json_serialize=_json_dumps,
+            )
+        return self._session
+
+    def _set_bearer_token(self, token: str) -> None:
+        """Use the bearer token for all following requests on the shared session."""
+        self._bearer_token = token
+        self._get_session().headers["Authorization"] = f"Bearer {token}"
+
+    def _set_token_expiry(self, expires: float | None) -> None:
+        """Record when the bearer token expires, and when to renew it."""
+        now = datetime.now(self._tz)
+        self.bearer_token_expires_on = now + timedelta(seconds=expires) if expires else now
+        self.__dict__.pop("bearer_token_expires_date", None)
+        # Renew an hour early. Closer than five minutes, log the time remaining.
+        self._reauth_at = self.bearer_token_expires_on - timedelta(hours=1)
+        self._reauth_log_at = self.bearer_token_expires_on - timedelta(minutes=5)
+
     def _build_api_endpoints(self) -> None:
         """Build endpoints needed to get sensor and settings data from the cloud.
 
         This method constructs the necessary API endpoints for various operations:
         - `flow`: Retrieves energy flow data for the plant.
-        - `plant_details`: Fetches detailed information about the plant.
-        - `inverter`: Gets real-time data for the specified inverter.
+        - `read_settings`: Reads the current settings of the inverter.
+        - `write_settings`: Writes new settings to the inverter.
         - `battery`: Retrieves real-time battery statistics.
         - `pv`: Fetches real-time photovoltaic (PV) data.
         - `grid`: Retrieves real-time grid statistics.
         - `load`: Gets real-time load data.
-        - `read_settings`: Reads the current settings of the inverter.
-        - `write_settings`: Writes new settings to the inverter.
         """
-        self._urls["flow"] = (
-            CLOUD_URL + "/api/v1/plant/energy/" + f"{self.plant_id}/flow"
-        )
-        self._urls["read_settings"] = (
-            CLOUD_URL + f"/api/v1/common/setting/{self.inverter_serial_number}/read"
-        )
-        self._urls["write_settings"] = (
-            CLOUD_URL + f"/api/v1/common/setting/{self.inverter_serial_number}/set"
-        )
-        prefix = CLOUD_URL + "/api/v1/inverter/"
-        self._urls["battery"] = (
-            prefix
-            # + f"battery/{self.inverter_serial_number}/realtime"
-            + f"battery/{self.inverter_serial_number}/realtime?sn={self.inverter_serial_number}&lan=en"
-        )
-        self._urls["pv"] = prefix + f"{self.inverter_serial_number}/realtime/input"
-        self._urls["grid"] = (
-            prefix
-            + f"grid/{self.inverter_serial_number}/realtime?sn={self.inverter_serial_number}&lan=en"
+        plant, sn = self.plant_id, self.inverter_serial_number
+        self._urls.update(
+            {
+                key: URL(CLOUD_URL + template.format(plant=plant, sn=sn))
+                for key, template in self._URL_TEMPLATES
+            }
         )
-        self._urls["load"] = prefix + f"load/{self.inverter_serial_number}/realtime"
 
     def _prepare_authorization_payload(self) -> dict[str, str]:
         """Prepare the payload for authentication or token renewal."""
@@ -219,9 +357,7 @@ class InverterAPI:
         if not (token and expires and self._refresh_token):
             return False
 
-        self.bearer_token_expires_on = datetime.now(
-            ZoneInfo(self.timezone)
-        ) + timedelta(seconds=expires)
+        self._set_token_expiry(expires)
         return True
 
     def _convert_inverter_model(self, value: str) -> str:
@@ -231,66 +367,59 @@ class InverterAPI:
     async def _update_flow(self) -> None:
         """Get statistics on this plant's flow."""
         # Double check the validity of the cloud session.
-        data = await self._request("GET", self._urls["flow"], body={})
+        data = await self._request("GET", self._urls["flow"], body={}, cached=True)
         if data is None:
             logger.error("Unable to update realtime power flow information")
             return
-
-        if self._safe_get(data, "soc") <= 0:
-            logger.critical("ODD BATTERY SOC: %s ", data)
+        # An unchanged response returns the data we already applied
+        if data is not self._flow_data and not self._apply_flow(data):
             return
-        self.realtime_battery_soc = self._safe_get(data, "soc")
-        self.realtime_battery_power = self._safe_get(data, "battPower")
-        self.realtime_load_power = self._safe_get(data, "loadOrEpsPower")
-        self.realtime_grid_power = self._safe_get(data, "gridOrMeterPower")
-        self.realtime_pv_power = self._safe_get(data, "pvPower")
-
-        # Calculate the current usable battery charge in Wh
-        self.batt_wh_usable = int(
-            self.batt_wh_per_percent * (self.realtime_battery_soc - self.batt_shutdown)
-        )
-
-        self.data_updated = datetime.now(ZoneInfo(self.timezone)).strftime(
-            "%a %I:%M %p"
-        )
+        self.realtime.updated = datetime.now(self._tz).strftime("%a %I:%M %p")
+
+    def _apply_flow(self, data: dict[str, Any]) -> bool:
+        """Set the realtime power values from the flow data. Return False if it looks wrong."""
+        get = data.get
+        soc = _to_float(get("soc"))
+        if soc <= 0:
+            logger.critical("ODD BATTERY SOC: %s", soc)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Flow data with the odd battery SoC: %s", data)
+            return False
+        realtime = self.realtime
+        realtime.battery_soc = soc
+        realtime.battery_power = _to_float(get("battPower"))
+        realtime.load_power = _to_float(get("loadOrEpsPower"))
+        realtime.grid_power = _to_float(get("gridOrMeterPower"))
+        realtime.pv_power = _to_float(get("pvPower"))
+        self._flow_data = data
+        return True
 
     async def _calculate_total_efficiency(self) -> None:
         """Calculate the long term (total) power efficiency."""
 
         # Only calculate the total efficiency once a month
-        if datetime.now(ZoneInfo(self.timezone)).month == self._efficiency_update_month:
+        now = datetime.now(self._tz)
+        if now < self._efficiency_next_check:
             return
 
         # Get totals for battery, PV, Grid, and Load from MySolark data cloud
-        logger.debug("Getting battery totals for monthly efficiency calculation")
-        data = await self._request("GET", self._urls["battery"], body={})
-        if data is None:
-            logger.error("Unable to update battery information")
-            return
-        total_batt_charge = float(data.get("etotalChg", 0))
-        total_batt_discharge = float(data.get("etotalDischg", 0))
-        self._batt_wh_max_est = int(float(data.get("capacity", 0)) * 48)
-
-        logger.debug("Getting PV totals")
-        data = await self._request("GET", self._urls["pv"], body={})
-        if data is None:
-            logger.error("Unable to update PV information")
-            return
-        total_pv = float(data.get("etotal", 0.0))
-
-        logger.debug("Getting grid totals")
-        data = await self._request("GET", self._urls["grid"], body={})
-        if data is None:
-            logger.error("Unable to update grid information")
-            return
-        total_grid_import_buy = float(data.get("etotalFrom", 0))
-
-        logger.debug("Getting load totals")
-        data = await self._request("GET", self._urls["load"], body={})
-        if data is None:
-            logger.error("Unable to update load information")
-            return
-        total_load = float(data.get("totalUsed", 0.0))
+        logger.debug("Getting battery, PV, grid and load totals for monthly efficiency calculation")
+        sources = ("battery", "pv", "grid", "load")
+        results = await asyncio.gather(
+            *(self._request("GET", self._urls[source], body={}) for source in sources),
+            return_exceptions=True,
+        )
+        for source, result in zip(sources, results, strict=True):
+            if result is None or isinstance(result, BaseException):
+                logger.error("Unable to update %s information", source)
+                return
+        batt, pv, grid, load = results
+        total_batt_charge = _to_float(batt.get("etotalChg"))
+        total_batt_discharge = _to_float(batt.get("etotalDischg"))
+        self._batt_wh_max_est = int(_to_float(batt.get("capacity")) * 48)
+        total_pv = _to_float(pv.get("etotal"))
+        total_grid_import_buy = _to_float(grid.get("etotalFrom"))
+        total_load = _to_float(load.get("totalUsed"))
 
         # Calculate the total power source and the total power efficiency
         total_source = (
@@ -304,131 +433,131 @@ class InverterAPI:
         logger.info("Total power efficiency is %.0f", efficiency * 100)
         self.efficiency = efficiency
 
-        # Update the month we last calculated the total efficiency
-        self._efficiency_update_month = datetime.now(ZoneInfo(self.timezone)).month
+        # Wait until the start of next month before calculating it again
+        self._efficiency_next_check = now.replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        ) + relativedelta(months=1)
 
-    async def _read_settings(self) -> dict[str, Any]:
+    async def _read_settings(self) -> None:
         """Read the inverter settings and set self values."""
-
-        # Create a settings dict to return (whether we get the settings or not)
-        settings: dict[str, Any] = {}
-        data = await self._request("GET", self._urls["read_settings"], body={})
-
+        data = await self._request(
+            "GET", self._urls["read_settings"], body={}, cached=True
+        )
         if data is None:
             logger.error("Unable to update load information")
-            return settings
-
-        if data is not None:
-            self._grid_boost_starting_soc = int(self._safe_get(data, "cap1"))
-            self.actual_grid_boost = int(self._safe_get(data, "cap1"))
-            self.grid_boost_start = data.get("sellTime1", DEFAULT_GRID_BOOST_START)
-            self.grid_boost_end = data.get("sellTime2", DEFAULT_GRID_BOOST_END)
-            batt_capacity_ah = self._safe_get(data, "batteryCap")
-            self.batt_shutdown = int(self._safe_get(data, "batteryShutdownCap"))
-            self.batt_low_warning = int(self._safe_get(data, "batteryLowCap"))
-            batt_float_voltage = self._safe_get(data, "floatVolt")
-            self.batt_wh_per_percent = batt_capacity_ah * batt_float_voltage / 100
-
-            self.grid_boost_wh_min = int(
-                self.batt_wh_per_percent * self._grid_boost_starting_soc
-            )
-
-        return settings
-
-    def _safe_get(self, data: dict[str, Any], key: str, default: float = 0.0) -> float:
-        """Convert a value to float safely, returning the default value if the value is None or cannot be converted."""
-        try:
-            value = data.get(key, default)
-            return float(value)
-        except (TypeError, ValueError):
-            return default
+            return
+        if data is self._settings_data:
+            # Nothing changed since the last read
+            return
+        self._settings_data = data
+
+        get = data.get
+        cap1 = int(_to_float(get("cap1")))
+        self._grid_boost_starting_soc = cap1
+        self.actual_grid_boost = cap1
+        self.grid_boost_start = get("sellTime1", DEFAULT_GRID_BOOST_START)
+        self.grid_boost_end = get("sellTime2", DEFAULT_GRID_BOOST_END)
+        batt_capacity_ah = _to_float(get("batteryCap"))
+        self.batt_shutdown = int(_to_float(get("batteryShutdownCap")))
+        self.batt_low_warning = int(_to_float(get("batteryLowCap")))
+        batt_float_voltage = _to_float(get("floatVolt"))
+        self.batt_wh_per_percent = batt_capacity_ah * batt_float_voltage / 100
+
+        self.grid_boost_wh_min = int(
+            self.batt_wh_per_percent * self._grid_boost_starting_soc
+        )
 
     async def _request(
-        self, method: str, endpoint: str, body: Any | None = None
+        self,
+        method: str,
+        endpoint: URL,
+        body: Any | None = None,
+        cached: bool = False,
     ) -> dict[str, Any] | None:
-        """Send a request to the Sol-Ark cloud and return the data portion of the response."""
+        """Send a request to the Sol-Ark cloud and return the data portion of the response.
 
-        # Log the time until we need to reauthenticate if we are between the top of the hour and five minutes before the hour
-        time_remaining = self.bearer_token_expires_on - datetime.now(
-            ZoneInfo(self.timezone)
-        )
-        if self._reauth_counter % 12 == 0 or time_remaining.total_seconds() < 300:
-            # TEMP Using logger.info instead of debug in semi-final version
-            logger.info(
-                "We need to reauthenticate in %s hours %s minutes",
-                time_remaining.total_seconds() // 3600 % 24,
-                time_remaining.total_seconds() // 60 % 60,
-            )
-        self._reauth_counter += 1
-
-        # Check if we need to reauthenticate
-        if self.bearer_token_expires_on and datetime.now(
-            ZoneInfo(self.timezone)
-        ) >= self.bearer_token_expires_on - timedelta(hours=1):
-            # TEMP Using logger.info instead of debug in semi-final version
-            logger.info("Reauthenticating to the Sol-Ark cloud")
-            if not await self.reauthenticate():
-                logger.error(
-                    "Failed to reauthenticate to the Sol-Ark cloud. Doing backup authentication."
+        With cached=True, a GET whose response has not changed returns the same data
+        object as the previous call.
+        """
+
+        # Check if we need to reauthenticate. This is the only per-request token work.
+        now = datetime.now(self._tz)
+        if now >= self._reauth_at:
+            if now >= self._reauth_log_at and logger.isEnabledFor(logging.INFO):
+                secs = int((self.bearer_token_expires_on - now).total_seconds())
+                hours, rem = divmod(secs, 3600)
+                logger.info(
+                    "We need to reauthenticate in %d hours %d minutes", hours, rem // 60
                 )
-                # Fallback if reauthentication fails.
-                payload = self._prepare_authorization_payload()
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        async with session.post(
-                            self._urls["auth"], json=payload, timeout=TIMEOUT
-                        ) as response:
-                            if response.status == 200:
-                                outer = await response.json()
-                                if outer is None:
-                                    logger.error(
-                                        "Failed to get a valid response from the authentication request"
-                                    )
-                                    return None
-                                data = outer.get("data", {})
-                                logger.info("Authenticated with Solark Inverter API")
-                                token = data.get("access_token", "")
-                                session.headers["Authorization"] = f"Bearer {token}"
-                                self._headers["Authorization"] = f"Bearer {token}"
-                                self._refresh_token = data.get("refresh_token", None)
-                                expires = data.get("expires_in", None)
-                                self.bearer_token_expires_on = (
-                                    datetime.now(ZoneInfo(self.timezone))
-                                    + timedelta(seconds=expires)
-                                    if expires
-                                    else datetime.now(ZoneInfo(self.timezone))
-                                )
-                    except aiohttp.ClientError as err:
-                        logger.error("Request error: %s", err)
-                        return None
+            # Only the first waiting request renews the token
+            async with self._auth_lock:
+                # Another request may have renewed the token while we waited
+                if datetime.now(self._tz) >= self._reauth_at:
+                    # TEMP Using logger.info instead of debug in semi-final version
+                    logger.info("Reauthenticating to the Sol-Ark cloud")
+                    if not await self.reauthenticate():
+                        logger.error(
+                            "Failed to reauthenticate to the Sol-Ark cloud. Doing backup authentication."
+                        )
+                        # The refresh token was refused, so log in again with the credentials
+                        self._refresh_token = None
+                        if not await self.authenticate():
+                            self.cloud_status = Cloud_Status.UNKNOWN
+                            return None
 
         if method == "GET":
-            return await self._get_request(endpoint)
+            return await self._get_request(endpoint, cached)
         if method == "POST":
             return await self._post_request(endpoint, body)
         logger.error("Unsupported HTTP method: %s", method)
         return None
 
-    async def _get_request(self, endpoint: str) -> dict[str, Any] | None:
+    async def _get_request(
+        self, endpoint: URL, cached: bool = False
+    ) -> dict[str, Any] | None:
         """Send a GET request to the Sol-Ark cloud and return the data portion of the response."""
-        async with aiohttp.ClientSession(headers=self._headers) as session:
-            try:
-                async with session.get(endpoint, timeout=TIMEOUT) as response:
-                    response_data = await response.json() if response else None
+        previous = self._get_cache.get(endpoint) if cached else None
+        headers = None
+        if previous is not None and (etag := self._etags.get(endpoint)):
+            headers = {"If-None-Match": etag}
+        try:
+            async with self._get_session().get(
+                endpoint, headers=headers, timeout=TIMEOUT
+            ) as response:
+                if not cached:
+                    response_data = _loads(await response.read())
                     return response_data.get("data") if response_data else None
-            except aiohttp.ClientError as err:
-                logger.error("Request error: %s", err)
+                if previous is not None and response.status == 304:
+                    return previous[1]
+                body = await response.read()
+                if previous is not None and body == previous[0]:
+                    return previous[1]
+                response_data = _loads(body)
+                data = response_data.get("data") if response_data else None
+                if response.status == 200 and data is not None:
+                    self._get_cache[endpoint] = (body, data)
+                    if etag := response.headers.get("ETag"):
+                        self._etags[endpoint] = etag
+                return data
+        except aiohttp.ClientError as err:
+            logger.error("Request error: %s", err)
+            return None
+
+    async def _get_json(self, url: URL) -> Any:
+        """Send a GET request and return the whole decoded response, or None if it failed."""
+        async with self._get_session().get(url, timeout=TIMEOUT) as response:
+            if response.status != 200:
                 return None
+            return _loads(await response.read())
 
-    async def _post_request(self, endpoint: str, body: Any) -> dict[str, Any] | None:
+    async def _post_request(self, endpoint: URL, body: Any) -> dict[str, Any] | None:
         """Send a POST request to the Sol-Ark cloud and return the response."""
-        async with aiohttp.ClientSession(headers=self._headers) as session:
-            try:
-                async with session.post(url=endpoint, json=body) as response:
-                    return await response.json() if response else None
-            except aiohttp.ClientError as err:
-                logger.error("Request error: %s", err)
-                return None
+        try:
+            async with self._get_session().post(url=endpoint, json=body) as response:
+                return _loads(await response.read())
+        except aiohttp.ClientError as err:
+            logger.error("Request error: %s", err)
+            return None
 
     # Public methods
     async def test_authenticate(self) -> bool:
@@ -455,7 +584,7 @@ class InverterAPI:
                     self._urls["auth"], json=payload, timeout=TIMEOUT
                 )
                 # Get the data from the response
-                response_data = await response.json() if response else None
+                response_data = _loads(await response.read())
                 # If the response is not OK, log the error and invalidate the session
                 if response_data is None or response_data.get("code") != 0:
                     logger.error("Test authentication failed to get a valid response")
@@ -474,108 +603,79 @@ class InverterAPI:
         logger.debug("Authenticating to the Sol-Ark cloud")
         # Prepare the payload for the login
         payload = self._prepare_authorization_payload()
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    self._urls["auth"], json=payload, timeout=TIMEOUT
-                ) as response:
-                    if response.status == 200:
-                        outer = await response.json()
-                        if outer is None:
-                            logger.error(
-                                "Failed to get a valid response from the authentication request"
-                            )
-                            return False
-                        data = outer.get("data", {})
-                        logger.info("Authenticated with Solark Inverter API")
-                        token = data.get("access_token", "")
-                        session.headers["Authorization"] = f"Bearer {token}"
-                        self._headers["Authorization"] = f"Bearer {token}"
-                        self._refresh_token = data.get("refresh_token", None)
-                        expires = data.get("expires_in", None)
-                        self.bearer_token_expires_on = (
-                            datetime.now(ZoneInfo(self.timezone))
-                            + timedelta(seconds=expires)
-                            if expires
-                            else datetime.now(ZoneInfo(self.timezone))
-                        )
-                        logger.debug("Getting plant info")
-                        async with session.get(
-                            self._urls["plant_list"],
-                            data=json.dumps({}),
-                            timeout=TIMEOUT,
-                        ) as response:
-                            if response.status == 200:
-                                outer = await response.json()
-                                if outer is None:
-                                    logger.error(
-                                        "Failed to get a valid response from the authentication request"
-                                    )
-                                    return False
-                                data = outer.get("data", {})
-                                infos: list[dict[str, Any]] = data.get("infos", [])
-                                if infos:
-                                    self.plant_name = infos[0].get("name", None)
-                                    self.plant_id = infos[0].get("id", None)
-                                    self.plant_address = infos[0].get("address", None)
-                                    self.plant_image_url = infos[0].get("thumbUrl", None)
-                                    self.plant_status = Plant(
-                                        infos[0].get("status", Plant.UNKNOWN)
-                                    )
-                                    created_date = infos[0].get("createAt", None)
-                                    if created_date:
-                                        self.plant_created = datetime.fromisoformat(
-                                            created_date
-                                        )
-                                    logger.debug(
-                                        "Plant status is: %s", self.plant_status
-                                    )
-
-                                # With the plant info, go get the plant inverter serial number
-                                async with session.get(
-                                    self._urls["inverter_list"],
-                                    data=json.dumps({}),
-                                    timeout=TIMEOUT,
-                                ) as response:
-                                    if response.status == 200:
-                                        outer = await response.json()
-                                        if outer is None:
-                                            logger.error(
-                                                "Failed to get a valid response from the authentication request"
-                                            )
-                                            return False
-                                        data = outer.get("data", {})
-                                        inverter_list = data.get("infos")
-                                        # If we don't have an inverter list, we can't continue. Log an error and return false.
-                                        if not inverter_list:
-                                            logger.error("No inverters found")
-                                            self.cloud_status = Cloud_Status.UNKNOWN
-                                            return False
-
-                                        # NOTE: We assume the master is inverter 0, store that inverter as the master
-                                        self.inverter_serial_number = inverter_list[0][
-                                            "sn"
-                                        ]
-                                        self.inverter_model = (
-                                            self._convert_inverter_model(
-                                                inverter_list[0]["model"]
-                                            )
-                                        )
-                                        self.inverter_status = Inverter(
-                                            inverter_list[0].get(
-                                                "status", Inverter.UNKNOWN
-                                            )
-                                        )
-                                        # Build the api endpoints needed to get sensor and settings data from the cloud
-                                        self._build_api_endpoints()
-                                        logger.debug(
-                                            "Successfully retrieved the inverter serial number"
-                                        )
-                                        # await self._calculate_total_efficiency()
-                                        return True
-            except aiohttp.ClientConnectorError as e:
-                logger.error("DNS resolution error: %s", e)
+        session = self._get_session()
+        try:
+            # The login response is parsed and released before the list requests go out
+            async with session.post(
+                self._urls["auth"], json=payload, timeout=TIMEOUT
+            ) as response:
+                outer = (
+                    _loads(await response.read())
+                    if response.status == 200
+                    else None
+                )
+            if outer is None:
+                logger.error(
+                    "Failed to get a valid response from the authentication request"
+                )
                 return False
+            data = outer.get("data", {})
+            logger.info("Authenticated with Solark Inverter API")
+            token = data.get("access_token", "")
+            self._set_bearer_token(token)
+            self._refresh_token = data.get("refresh_token", None)
+            expires = data.get("expires_in", None)
+            self._set_token_expiry(expires)
+
+            # The plant and inverter lists don't depend on each other, so get both at once
+            logger.debug("Getting plant and inverter info")
+            plants, inverters = await asyncio.gather(
+                self._get_json(self._urls["plant_list"]),
+                self._get_json(self._urls["inverter_list"]),
+            )
+            if plants is None:
+                logger.error("Failed to get a valid response from the plant list request")
+                return False
+            if inverters is None:
+                logger.error(
+                    "Failed to get a valid response from the inverter list request"
+                )
+                return False
+        except aiohttp.ClientConnectorError as e:
+            logger.error("DNS resolution error: %s", e)
+            return False
+
+        # The plant and inverter identity is about to be set from the responses
+        self.__dict__.pop("sensor_identity", None)
+        data = plants.get("data", {})
+        infos: list[dict[str, Any]] = data.get("infos", [])
+        if infos:
+            self.plant_name = infos[0].get("name", None)
+            self.plant_id = infos[0].get("id", None)
+            self.plant_address = infos[0].get("address", None)
+            self.plant_image_url = infos[0].get("thumbUrl", None)
+            self.plant_status = Plant(infos[0].get("status", Plant.UNKNOWN))
+            created_date = infos[0].get("createAt", None)
+            if created_date:
+                self.plant_created = datetime.fromisoformat(created_date)
+                self.__dict__.pop("plant_created_date", None)
+            logger.debug("Plant status is: %s", self.plant_status)
+
+        data = inverters.get("data", {})
+        inverter_list = data.get("infos")
+        # If we don't have an inverter list, we can't continue. Log an error and return false.
+        if not inverter_list:
+            logger.error("No inverters found")
+            self.cloud_status = Cloud_Status.UNKNOWN
+            return False
+
+        # NOTE: We assume the master is inverter 0, store that inverter as the master
+        self.inverter_serial_number = inverter_list[0]["sn"]
+        self.inverter_model = self._convert_inverter_model(inverter_list[0]["model"])
+        self.inverter_status = Inverter(inverter_list[0].get("status", Inverter.UNKNOWN))
+        # Build the api endpoints needed to get sensor and settings data from the cloud
+        self._build_api_endpoints()
+        logger.debug("Successfully retrieved the inverter serial number")
         return True
 
     async def reauthenticate(self) -> bool:
@@ -591,13 +691,10 @@ class InverterAPI:
         }
 
         try:
-            async with (
-                aiohttp.ClientSession() as session,
-                session.post(
-                    self._urls["auth"], json=payload, timeout=TIMEOUT
-                ) as response,
-            ):
-                response_data = await response.json()
+            async with self._get_session().post(
+                self._urls["auth"], json=payload, timeout=TIMEOUT
+            ) as response:
+                response_data = _loads(await response.read()) or {}
                 if response_data.get("msg") != "Success":
                     logger.error(
                         "Reauthentication failed with message: %s, response data: %s",
@@ -613,22 +710,21 @@ class InverterAPI:
                     )
                     self.cloud_status = Cloud_Status.UNKNOWN
                     return False
-                logger.debug("Reauthentication data is %s", response_data)
                 token = data.get("access_token", "")
-                session.headers["Authorization"] = f"Bearer {token}"
-                self._headers["Authorization"] = f"Bearer {token}"
+                self._set_bearer_token(token)
                 self._refresh_token = data.get("refresh_token", None)
                 expires = data.get("expires_in", None)
-                self.bearer_token_expires_on = (
-                    datetime.now(ZoneInfo(self.timezone)) + timedelta(seconds=expires)
-                    if expires
-                    else datetime.now(ZoneInfo(self.timezone))
-                )
+                self._set_token_expiry(expires)
                 self.cloud_status = Cloud_Status.ONLINE
-                logger.debug("self._headers is now %s", self._headers)
-                logger.debug(
-                    "-------------------------------------------------------------------------------"
-                )
+                # These dump whole dicts, so only build the messages when they are shown
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Reauthentication data is %s", response_data)
+                    logger.debug(
+                        "Session headers are now %s", self._get_session().headers
+                    )
+                    logger.debug(
+                        "-------------------------------------------------------------------------------"
+                    )
                 return True
 
         except aiohttp.ClientError as err:
@@ -636,44 +732,51 @@ class InverterAPI:
             self.cloud_status = Cloud_Status.UNKNOWN
             return False
 
+    async def aclose(self) -> None:
+        """Close the shared session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
     async def refresh_data(self) -> None:
         """Update statistics on this plant's various components and return them as a dict."""
-        # Update efficiency once a month
-        await self._calculate_total_efficiency()
+        # Update efficiency once a month, and get the realtime stats for this plant.
+        # The requests are independent, so send them together.
+        await asyncio.gather(
+            self._calculate_total_efficiency(),
+            self._read_settings(),
+            self._update_flow(),
+        )
 
-        # Get the realtime stats for this plant, raising an exception if there is a problem
-        await self._read_settings()
-        await self._update_flow()
+        # Calculate the current usable battery charge in Wh, which needs both the
+        # settings and the flow
+        self.realtime.batt_wh_usable = int(
+            self.batt_wh_per_percent * (self.realtime.battery_soc - self.batt_shutdown)
+        )
 
         # Report that the cloud status was good
         self.cloud_status = Cloud_Status.ONLINE
 
-    async def write_grid_boost_soc(self, boost: str) -> None:
+    async def write_grid_boost_soc(self, boost: BoostMode) -> None:
         """Set the inverter setting for Time of Use block 1, State of Charge as per the supplied directive."""
 
-        # Set the inverter settings for Time of Use block 1, State of Charge
-        body: dict[str, str | bool] = {}
-        body["sellTime1"] = str(self.grid_boost_start)
         # If we are doing testing, just return
-        if boost == "testing":
+        if boost is BoostMode.TESTING:
             logger.info("Testing grid boost, no changes made.")
             return
-        # If we are doing a manual boost, set the SoC to the manual boost value
-        if boost == "manual":
-            body["cap1"] = str(self.manual_grid_boost)
-            body["time1on"] = True
-        # If we are doing the automatic calculated boost, set the SoC to the calculated value
-        elif boost == "automatic":
-            body["cap1"] = str(self.calculated_grid_boost)
-            body["time1on"] = True
-        # If we are turning off the boost, set the SoC to 0
-        elif boost == "off":
-            body["cap1"] = "0"
-            body["time1on"] = False
-        else:
+        mode = self._BOOST_MODES.get(boost)
+        if mode is None:
             logger.error("Invalid grid boost setting: %s", boost)
             return
 
+        # Set the inverter settings for Time of Use block 1, State of Charge
+        cap1, time1on = mode(self)
+        body: dict[str, str | bool] = {
+            "sellTime1": str(self.grid_boost_start),
+            "cap1": cap1,
+            "time1on": time1on,
+        }
+
         if not self._urls.get("write_settings"):
             logger.error("write_settings URL is not set")
             return
@@ -691,8 +794,27 @@ class InverterAPI:
         )
 
 
+@dataclass(slots=True)
+class RealtimeSnapshot:
+    """The realtime values read from the plant flow."""
+
+    battery_soc: float = 0.0
+    battery_power: float = 0.0
+    grid_power: float = 0.0
+    load_power: float = 0.0
+    pv_power: float = 0.0
+    batt_wh_usable: int = 0  # Current battery charge in Wh
+    updated: str = ""
+
+
 # Enum classes
-class Inverter(Enum):
+class _StatusEnum(IntEnum):
+    """IntEnum that keeps the Enum style str() (Class.MEMBER) used in the sensor attributes."""
+
+    __str__ = Enum.__str__
+
+
+class Inverter(_StatusEnum):
     """Sol-Ark Inverter Status."""
 
     OFFLINE = 0
@@ -703,7 +825,7 @@ class Inverter(Enum):
     UNKNOWN = 9
 
 
-class Plant(Enum):
+class Plant(_StatusEnum):
     """Sol-Ark Plant Status."""
 
     OFFLINE = 0
@@ -713,7 +835,7 @@ class Plant(Enum):
     UNKNOWN = 9
 
 
-class Batt_Status(Enum):
+class Batt_Status(_StatusEnum):
     """Sol-Ark Battery Status."""
 
     DISCHARGING = 0
@@ -722,14 +844,14 @@ class Batt_Status(Enum):
     UNKNOWN = 9
 
 
-class Cloud_Status(Enum):
+class Cloud_Status(_StatusEnum):
     """Sol-Ark Data Cloud Status."""
 
     ONLINE = 0
     UNKNOWN = 9
 
 
-class Plant_Status(Enum):
+class Plant_Status(_StatusEnum):
     """Sol-Ark Plant Status."""
 
     OFFLINE = 0
@@ -6,7 +6,7 @@ Classes:
     SolcastEstimator: Handles the integration with the Solcast API to estimate PV generation for tomorrow.
                       It saves raw data to a file and processes it to estimate PV generation, avoiding API rate limits.
                       It also saves damping factors to a file for recall after reboots.
-    SolcastStatus: Enum representing the status of the Sol-Ark Inverter, including API faults, normal operation,
+    SolcastStatus: IntEnum representing the status of the Sol-Ark Inverter, including API faults, normal operation,
                    configuration status, and read errors.
 """
 
@@ -14,17 +14,25 @@ from __future__ import annotations
 
 import asyncio
 from datetime import datetime, timedelta
-from enum import Enum
+from enum import IntEnum
 import logging
+import random
+import time
 from zoneinfo import ZoneInfo
 
 import aiohttp
-import pandas as pd
+import numpy as np
+import orjson
 
 from .const import (
     DEBUGGING,
     DEFAULT_SOLCAST_PERCENTILE,
     DEFAULT_SOLCAST_UPDATE_HOUR,
+    SOLCAST_MAX_ATTEMPTS,
+    SOLCAST_MAX_RETRY_DELAY,
+    SOLCAST_RETRY_RESERVE,
+    SOLCAST_DAILY_REQUEST_LIMIT,
+    SOLCAST_NIGHT_INTERVAL_FACTOR,
     TIMEOUT,
 )
 
@@ -65,13 +73,21 @@ class SolcastAPI:
     """
 
     # Constructor
-    def __init__(self, api_key: str, resource_id: str, timezone: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        resource_id: str,
+        timezone: str,
+        session: aiohttp.ClientSession | None = None,
+    ) -> None:
         """Initialize key variables for API calls and data calculations.
 
         Args:
             api_key (str): The API key for Solcast.
             resource_id (str): The resource ID for Solcast.
             timezone (str): The timezone for the location of the solar installation.
+            session (aiohttp.ClientSession | None): A shared session (normally Home Assistant's).
+                If not given, one is created on first use and closed by aclose().
 
         This method sets up the necessary variables to estimate solar activity using Solcast.com.
 
@@ -80,48 +96,262 @@ class SolcastAPI:
         self._api_key: str = api_key
         self._resource_id: str = resource_id
         self.timezone: str = timezone
+        self._tz = ZoneInfo(timezone)
+        self._session: aiohttp.ClientSession | None = session
+        self._owns_session: bool = session is None
 
         self.status = SolcastStatus.UNKNOWN
         self.data_updated: datetime | None = None
-        # forecast is a dictionary of kWh hourly estimates with the date/hour as the key and the value as a tuple of float and bool.
-        self.forecast: dict[str, tuple[float, float]] = {}
+        # raw_forecast is the list of 30-minute periods as returned by the API.
+        self.raw_forecast: list[dict[str, str | float]] = []
+        # Validators from the last full response, sent back so an unchanged forecast comes back as a 304
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        # The hourly forecast is held as two arrays indexed by local wall clock hours since the epoch (see hour_key) less
+        #  _base_hour: the kWh target estimate and the sun ratio for each hour. Use hourly_forecast() to read it.
+        self._base_hour: int = 0
+        self._target_pv: np.ndarray = np.zeros(0, dtype=np.float32)
+        self._sun_ratio: np.ndarray = np.zeros(0, dtype=np.float32)
         self.day_forecast: float = 0.0
         self.energy_production_tomorrow = 0.0
+        # Setting percentile also sets _percentile_weights (see the property below)
+        self._percentile: int = DEFAULT_SOLCAST_PERCENTILE
+        self._percentile_weights: np.ndarray = np.zeros(3)
         self.percentile = DEFAULT_SOLCAST_PERCENTILE
         self.update_hour: int = DEFAULT_SOLCAST_UPDATE_HOUR
+        # Epoch times of the API requests made in the last 24 hours. tou_scheduler persists these so a
+        #  restart does not reset the daily request budget.
+        self.api_calls: list[float] = []
+
+    @property
+    def percentile(self) -> int:
+        """The forecast percentile (10 to 90) the user wants to plan with."""
+        return self._percentile
+
+    @percentile.setter
+    def percentile(self, value: int) -> None:
+        """Set the percentile and the weights for the 10/50/90 estimates that interpolate it.
+
+        A forecast we already have is rebuilt for the new percentile straight away.
+        """
+        changed = value != self._percentile
+        self._percentile = value
+        if value <= 50:
+            weight = (value - 10) / 40
+            self._percentile_weights = np.array((1 - weight, weight, 0.0))
+        else:
+            weight = (value - 50) / 40
+            self._percentile_weights = np.array((0.0, 1 - weight, weight))
+        if changed and self.raw_forecast:
+            self.process_forecast()
 
     # Public methods
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the session, creating our own on first use if none was given."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=4)
+            )
+            self._owns_session = True
+        return self._session
+
+    async def aclose(self) -> None:
+        """Close the session if we created it. A shared session belongs to its owner."""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _api_calls_remaining(self) -> int:
+        """Return how many API requests are left in the rolling 24 hour budget."""
+        now = time.time()
+        self.api_calls = [t for t in self.api_calls if now - t < 86400]
+        return SOLCAST_DAILY_REQUEST_LIMIT - len(self.api_calls)
+
+    def _refresh_interval(self) -> timedelta:
+        """Return how long to wait between refreshes at this time of day.
+
+        Spread the daily request budget (less the one scheduled at update_hour) so that night refreshes
+        are SOLCAST_NIGHT_INTERVAL_FACTOR times further apart than daylight ones:
+            day_hours / day_interval + night_hours / (factor * day_interval) = requests
+        Daylight hours are the hours of the last 24 with a PV forecast.
+        """
+        current = self._hour_key()
+        day_hours = sum(
+            1
+            for hour in range(current - 12, current + 12)
+            if self.hourly_forecast(hour)[0] > 0
+        )
+        if not day_hours:
+            return timedelta(days=1)
+        night_hours = 24 - day_hours
+        requests = max(SOLCAST_DAILY_REQUEST_LIMIT - 1, 1)
+        day_interval = (day_hours + night_hours / SOLCAST_NIGHT_INTERVAL_FACTOR) / requests
+        if self.hourly_forecast(current)[0] > 0:
+            return timedelta(hours=day_interval)
+        return timedelta(hours=day_interval * SOLCAST_NIGHT_INTERVAL_FACTOR)
+
+    @property
+    def first_hour(self) -> int:
+        """Return the hour key of the first forecast hour (the arrays start there, so no search is needed)."""
+        return self._base_hour
+
+    def hourly_forecast(self, hour: int) -> tuple[float, float]:
+        """Return the (kWh target estimate, sun ratio) for the given hour key, or zeros outside the forecast."""
+        index = hour - self._base_hour
+        if 0 <= index < len(self._target_pv):
+            return float(self._target_pv[index]), float(self._sun_ratio[index])
+        return 0.0, 0.0
+
+    def target_pv_for(self, hours: np.ndarray) -> np.ndarray:
+        """Return the kWh target estimates for an array of hour keys, with zeros outside the forecast."""
+        index = hours - self._base_hour
+        valid = (index >= 0) & (index < len(self._target_pv))
+        result = np.zeros(len(hours), dtype=np.float64)
+        result[valid] = self._target_pv[index[valid]]
+        return result
+
+    def set_hourly_forecast(self, hourly: dict[int, tuple[float, float]]) -> None:
+        """Replace the forecast with the given {hour key: (kWh target estimate, sun ratio)} values."""
+        if not hourly:
+            self._base_hour = 0
+            self._target_pv = np.zeros(0, dtype=np.float32)
+            self._sun_ratio = np.zeros(0, dtype=np.float32)
+            return
+        self._base_hour = min(hourly)
+        size = max(hourly) - self._base_hour + 1
+        self._target_pv = np.zeros(size, dtype=np.float32)
+        self._sun_ratio = np.zeros(size, dtype=np.float32)
+        for hour, (target_pv, sun_ratio) in hourly.items():
+            self._target_pv[hour - self._base_hour] = target_pv
+            self._sun_ratio[hour - self._base_hour] = sun_ratio
+
+    @staticmethod
+    def hour_key(moment: datetime) -> int:
+        """Return the forecast key for the local clock hour containing the given aware datetime.
+
+        The key counts wall clock hours since the epoch in the datetime's own zone, so key % 24 is the local
+        hour of day, even in zones with half hour offsets.
+        """
+        offset = moment.utcoffset()
+        seconds = moment.timestamp() + (offset.total_seconds() if offset else 0)
+        return int(seconds // 3600)
+
+    def hour_start(self, key: int) -> datetime:
+        """Return the local start of the hour with the given forecast key."""
+        return (datetime(1970, 1, 1) + timedelta(hours=key)).replace(tzinfo=self._tz)
+
+    def _hour_key(self, offset_hours: int = 0) -> int:
+        """Return the forecast key for the current hour plus the given offset."""
+        return self.hour_key(datetime.now(self._tz)) + offset_hours
+
     def get_current_hour_pv_estimate(self) -> float:
         """Get the estimate for the current hour PV."""
-        current_hour = datetime.now(ZoneInfo(self.timezone)).strftime("%Y-%m-%d-%H")
+        current_hour = self._hour_key()
         # Return the current hour estimate
-        return round(1000 * self.forecast.get(current_hour, (0.0, 0.0))[0], 0)
+        return round(1000 * self.hourly_forecast(current_hour)[0], 0)
 
     def get_previous_hour_pv_estimate(self) -> float:
         """Get the estimate for the current hour PV."""
-        previous_hour = (
-            datetime.now(ZoneInfo(self.timezone)) + timedelta(hours=1)
-        ).strftime("%Y-%m-%d-%H")
-        logger.debug(
-            "Looking at %s. Got forecast of %s",
-            previous_hour,
-            round(1000 * self.forecast.get(previous_hour, (0.0, 0.0))[0], 0),
-        )
+        previous_hour = self._hour_key(1)
+        estimate = round(1000 * self.hourly_forecast(previous_hour)[0], 0)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Looking at %s. Got forecast of %s",
+                self.hour_start(previous_hour),
+                estimate,
+            )
         # Return the current hour estimate
-        return round(1000 * self.forecast.get(previous_hour, (0.0, 0.0))[0], 0)
+        return estimate
 
     def get_previous_hour_sun_estimate(self) -> float:
         """Get the sun status for the previous hour."""
-        previous_hour = (
-            datetime.now(ZoneInfo(self.timezone)) - timedelta(hours=1)
-        ).strftime("%Y-%m-%d-%H")
+        previous_hour = self._hour_key(-1)
+        sun_ratio = self.hourly_forecast(previous_hour)[1]
         # Return the current hour estimate
-        logger.debug(
-            "Sun ratio for %s is %s",
-            printable_hour(int(previous_hour[-2:])),
-            self.forecast.get(previous_hour, (0.0, 0.0))[1],
-        )
-        return self.forecast.get(previous_hour, (0.0, 0.0))[1]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Sun ratio for %s is %s",
+                printable_hour(previous_hour % 24),
+                sun_ratio,
+            )
+        return sun_ratio
+
+    async def _fetch_forecast(
+        self, url: str, headers: dict[str, str]
+    ) -> list[dict[str, str | float]] | None:
+        """Get the raw forecast periods, retrying throttled and transient failures.
+
+        A 429 waits for Retry-After when given, anything else retryable (5xx, connection errors, timeouts)
+        backs off exponentially with jitter. Only tries that reach Solcast (get a response) count against the
+        daily request budget, and there are no retries once the budget is nearly used up. Returns None
+        (after setting API_FAULT if we actually tried and failed) if there is no forecast to process, and
+        raw_forecast itself if the server says it has not changed (304).
+        """
+        if self.raw_forecast:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        for attempt in range(SOLCAST_MAX_ATTEMPTS):
+            # Never go over the daily request budget, whatever the schedule says, and keep a reserve
+            #  for the scheduled refreshes rather than spending it on retries
+            remaining = self._api_calls_remaining()
+            if not attempt and remaining <= 0:
+                logger.warning(
+                    "Skipping Solcast refresh: %s requests already made in the last 24 hours",
+                    len(self.api_calls),
+                )
+                return None
+            if attempt and remaining <= SOLCAST_RETRY_RESERVE:
+                logger.warning("Not retrying Solcast: only %s requests left today", remaining)
+                break
+
+            delay: float = min(2**attempt, SOLCAST_MAX_RETRY_DELAY) + random.random()
+            try:
+                # Reuse the session so the connection to Solcast can be kept alive
+                async with self._get_session().get(
+                    url, headers=headers, timeout=TIMEOUT
+                ) as response:
+                    # The request reached Solcast, so it counts against the budget
+                    self.api_calls.append(time.time())
+                    if response.status == 429:
+                        retry_after = response.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = int(retry_after)
+                    if response.status == 304:
+                        return self.raw_forecast
+                    response.raise_for_status()
+                    data = orjson.loads(await response.read())
+                    self._etag = response.headers.get("ETag")
+                    self._last_modified = response.headers.get("Last-Modified")
+                    return data.get("forecasts", None)
+
+            except aiohttp.ClientResponseError as errh:
+                logger.error("HTTP Error: %s", errh)
+                if errh.status != 429 and errh.status < 500:
+                    break
+            except aiohttp.ClientConnectionError as errc:
+                logger.error("Error Connecting:  %s", errc)
+            except TimeoutError as errt:
+                logger.error("Timeout Error:  %s", errt)
+            except aiohttp.ClientError as err:
+                logger.error("Something Else:  %s", err)
+                break
+            except orjson.JSONDecodeError as err:
+                logger.error("Invalid forecast data:  %s", err)
+                break
+
+            if attempt + 1 == SOLCAST_MAX_ATTEMPTS:
+                break
+            if delay > SOLCAST_MAX_RETRY_DELAY + 1:
+                logger.warning("Solcast asked us to wait %s seconds. Trying again later.", delay)
+                break
+            logger.debug("Retrying Solcast request in %.1f seconds", delay)
+            await asyncio.sleep(delay)
+
+        # Only a fault once we have run out of tries
+        self.status = SolcastStatus.API_FAULT
+        return None
 
     async def refresh_data(self) -> bool:
         """Refresh Solcast data.
@@ -129,7 +359,8 @@ class SolcastAPI:
         This method assumes that tou_scheduler is responsible to save forecast data when it is updated,
         and load forecast data when home assistant is restarted.
 
-        It also assumes that this is called only once per hour.
+        It also assumes that this is called only once per hour. Besides the daily refresh at update_hour,
+        the remaining request budget is spread across the day, more often while the sun is up.
 
         This method checks to see if we need to update the Solcast data. If we do, it fetches the latest
         forecast data from the Solcast API, processes it, and updates the internal state.
@@ -140,106 +371,100 @@ class SolcastAPI:
             bool: True if the data was successfully refreshed, False if we did nothing.
 
         """
-        now: datetime = datetime.now(ZoneInfo(self.timezone))
-        # If we have already updated today but it isn't the right hour to refresh, return.
+        now: datetime = datetime.now(self._tz)
+        # If we have already updated today, it isn't the right hour to refresh and the refresh interval for this
+        #  time of day hasn't passed, return. (Allow a few minutes of slack as we are called about once an hour.)
         if (
             self.data_updated
             and (self.data_updated.date() == now.date())
             and (now.hour != self.update_hour)
+            and (now - self.data_updated + timedelta(minutes=5) < self._refresh_interval())
         ):
             return False
 
         # Set the update date to now so that even if the api call fails, we don't try again until the next hour.
         self.data_updated = now
 
+        # Build the url
+        url = f"https://api.solcast.com.au/rooftop_sites/{self._resource_id}/forecasts?format=json"
+        headers: dict[str, str] = {"Authorization": f"Bearer {self._api_key}"}
+
         # Try to get data from the API.
-        raw_forecast: dict[str, str | float] = {}
-        try:
-            # Build the url
-            url = f"https://api.solcast.com.au/rooftop_sites/{self._resource_id}/forecasts?format=json"
-            headers: dict[str, str] = {"Authorization": f"Bearer {self._api_key}"}
-
-            # Open a session and get the data and close the session
-            async with aiohttp.ClientSession() as session:
-                response = await session.get(url, headers=headers, timeout=TIMEOUT)
-                response.raise_for_status()
-                data = await response.json()
-                raw_forecast = data.get("forecasts", None)
-
-        except aiohttp.ClientResponseError as errh:
-            logger.error("HTTP Error: %s", errh)
-            self.status = SolcastStatus.API_FAULT
-            return False
-        except aiohttp.ClientConnectionError as errc:
-            logger.error("Error Connecting:  %s", errc)
-            self.status = SolcastStatus.API_FAULT
-            return False
-        except TimeoutError as errt:
-            logger.error("Timeout Error:  %s", errt)
-            self.status = SolcastStatus.API_FAULT
-            return False
-        except aiohttp.ClientError as err:
-            logger.error("Something Else:  %s", err)
-            self.status = SolcastStatus.API_FAULT
+        raw_forecast = await self._fetch_forecast(url, headers)
+        if raw_forecast is None:
             return False
-
-        # Convert input data to a DataFrame
-        df = pd.DataFrame(raw_forecast)
+        if raw_forecast is self.raw_forecast:
+            # Not modified: the forecast we hold is still current
+            logger.debug("Solcast forecast unchanged since the last refresh")
+            self.status = SolcastStatus.API_NORMAL
+            return True
 
         # If we have no data, note the fault and return
-        if df.empty:
+        if not raw_forecast:
             logger.error("No data available for tomorrow")
             self.status = SolcastStatus.API_FAULT
             return False
 
-        # Parse the period_end column, assuming the format includes a 'Z' for UTC
-        df["period_end"] = pd.to_datetime(df["period_end"], utc=True)
-
-        # Convert to the local timezone
-        df["period_end"] = await asyncio.to_thread(
-            df["period_end"].dt.tz_convert, ZoneInfo(self.timezone)
-        )
+        # Keep the raw periods (tou_scheduler saves them so a restart needs no API call) and process them
+        self.raw_forecast = raw_forecast
+        self.process_forecast()
+        # All done
+        self.status = SolcastStatus.API_NORMAL
+        return True
 
-        # Calculate the user specified target estimate based on linear interpolation
-        if self.percentile <= 50:
-            df["target_pv"] = df["pv_estimate10"] + (self.percentile - 10) / 40 * (
-                df["pv_estimate"] - df["pv_estimate10"]
-            )
-        else:
-            df["target_pv"] = df["pv_estimate"] + (self.percentile - 50) / 40 * (
-                df["pv_estimate90"] - df["pv_estimate"]
+    def process_forecast(self) -> None:
+        """Turn the raw Solcast periods into the hourly forecast for the current percentile."""
+        # Gather the 30-minute periods into arrays of hour keys and 10/50/90 percentile estimates.
+        #  The period_end values are UTC with a trailing 'Z', so convert them to the local clock hour.
+        hours: list[int] = []
+        estimates: list[tuple[float, float, float]] = []
+        for period in self.raw_forecast:
+            try:
+                period_end = datetime.fromisoformat(period["period_end"])
+            except (KeyError, TypeError, ValueError):
+                logger.debug("Skipping invalid forecast period: %s", period)
+                continue
+            hours.append(self.hour_key(period_end.astimezone(self._tz)))
+            estimates.append(
+                (
+                    float(period.get("pv_estimate10") or 0.0),
+                    float(period.get("pv_estimate") or 0.0),
+                    float(period.get("pv_estimate90") or 0.0),
+                )
             )
+        if not hours:
+            self.set_hourly_forecast({})
+            self.day_forecast = 0.0
+            return
+
+        # Average the periods falling in each hour (normally two, as Solcast periods are PT30M).
+        #  Hours missing from the data are left at zero.
+        base_hour = min(hours)
+        hour_index = np.asarray(hours) - base_hour
+        values = np.asarray(estimates)
+        counts = np.bincount(hour_index)[:, np.newaxis]
+        sums = np.column_stack(
+            [np.bincount(hour_index, weights=values[:, column]) for column in range(3)]
+        )
+        hourly = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
 
-        # Drop the 'period' column if it exists in the resampled DataFrame
-        if "period" in df.columns:
-            # df.drop(columns=["period"], inplace=True)
-            await asyncio.to_thread(df.drop, columns=["period"], inplace=True)
-
-        # Resample to hourly intervals, summing 30-minute increments
-        df = df.resample("h", on="period_end").mean().reset_index()
-
-        # Round the pv_estimate and pv_estimate90 columns to one decimal place
-        df["pv_estimate"] = df["pv_estimate"].round(1)
-        df["pv_estimate90"] = df["pv_estimate90"].round(1)
+        # Calculate the user specified target estimate based on linear interpolation, using the 10/50/90
+        #  weights worked out when the percentile was set
+        target_pv = hourly @ self._percentile_weights
 
-        # Add a column that checks for full sun. This is the 50th percentile / the 90th percentile, both rounded to 1 decimal place.
-        df["sun_ratio"] = (df["pv_estimate"] / df["pv_estimate90"]).round(1)
+        # The sun ratio checks for full sun: the 50th percentile / the 90th percentile, both rounded to
+        #  one decimal place.
+        p50 = hourly[:, 1].round(1)
+        p90 = hourly[:, 2].round(1)
+        sun_ratio = np.divide(p50, p90, out=np.zeros(len(p50)), where=p90 > 0).round(1)
 
-        # Create a dictionary with the local date and hour (yyyy-mm-dd-h) as the key and target_pv and is_full_sun as the value list
-        self.forecast = {
-            f"{row['period_end'].date()}-{row['period_end'].hour}": (
-                0.0 if pd.isna(row["target_pv"]) else row["target_pv"],
-                0.0 if pd.isna(row["sun_ratio"]) else row["sun_ratio"],
-            )
-            for _, row in df.iterrows()
-        }
-        self.day_forecast = df["target_pv"].sum()
-        # All done
-        self.status = SolcastStatus.API_NORMAL
-        return True
+        self._base_hour = base_hour
+        self._target_pv = target_pv.astype(np.float32)
+        self._sun_ratio = sun_ratio.astype(np.float32)
+        self.day_forecast = float(self._target_pv.sum())
 
 
-class SolcastStatus(Enum):
+class SolcastStatus(IntEnum):
     """Sol-Ark Inverter Status."""
 
     NOT_CONFIGURED = 0
@@ -2,20 +2,25 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
-from datetime import date, datetime, timedelta
+import asyncio
+from datetime import UTC, date, datetime, timedelta
+from functools import lru_cache
 import logging
+import time
 from types import MappingProxyType
+from typing import TypedDict
 from zoneinfo import ZoneInfo
 
-import pandas as pd
+import numpy as np
 
 from homeassistant.components.recorder import get_instance, statistics
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.storage import Store
 
 from .const import (
+    BOOST_MODE_FROM_STR,
     DEBUGGING,
     DEFAULT_GRID_BOOST_HISTORY,
     DEFAULT_GRID_BOOST_MIDNIGHT_SOC,
@@ -26,6 +31,8 @@ from .const import (
     DEFAULT_SOLCAST_UPDATE_HOUR,
     FORECAST_KEY,
     SHADE_KEY,
+    SOLCAST_CALLS_KEY,
+    BoostMode,
 )
 from .coordinator import TOUUpdateCoordinator
 from .solark_inverter_api import InverterAPI
@@ -41,9 +48,50 @@ else:
 # Helper functions
 def string_to_int_list(string_list) -> list[int]:
     """Convert a string containing one or more integers into a list of ints."""
-    return [int(i.strip()) for i in string_list.split(",") if i.strip().isdigit()]
+    int_list = []
+    for item in string_list.split(","):
+        # int() ignores surrounding whitespace; skip anything that is not an integer
+        try:
+            int_list.append(int(item))
+        except ValueError:
+            continue
+    return int_list
+
+
+def parse_boost_mode(value: str | BoostMode) -> BoostMode:
+    """Return the grid boost mode for an option or service value, defaulting to testing if it is unknown."""
+    mode = BOOST_MODE_FROM_STR.get(str(value).lower())
+    if mode is None:
+        logger.error("Invalid grid boost setting: %s. Using testing.", value)
+        return BoostMode.TESTING
+    return mode
+
+
+def hourly_load_averages(
+    starts: np.ndarray, means: np.ndarray, tz: ZoneInfo
+) -> np.ndarray:
+    """Return the mean load for each hour of the day from hourly statistics.
+
+    starts are the statistic start timestamps and means the mean load of each. Hours with no data get the
+    1000 Wh default used elsewhere.
+    """
+    # Work out the local hour of day of each start. If the UTC offset is the same at both ends of the
+    #  history (no DST change in between) this is plain arithmetic, otherwise convert each start.
+    offset = datetime.fromtimestamp(starts.min(), tz=tz).utcoffset()
+    if offset == datetime.fromtimestamp(starts.max(), tz=tz).utcoffset():
+        hours = ((starts + offset.total_seconds()) // 3600 % 24).astype(np.int64)
+    else:
+        hours = np.array(
+            [datetime.fromtimestamp(start, tz=tz).hour for start in starts.tolist()]
+        )
 
+    # Average by hour
+    counts = np.bincount(hours, minlength=24)
+    sums = np.bincount(hours, weights=means, minlength=24)
+    return np.divide(sums, counts, out=np.full(24, 1000.0), where=counts > 0)
 
+
+@lru_cache(maxsize=32)
 def printable_hour(hour: int) -> str:
     """Return a printable hour string in 12-hour format with 'am' or 'pm' suffix.
 
@@ -59,6 +107,56 @@ def printable_hour(hour: int) -> str:
     )
 
 
+class TOUSensorData(TypedDict):
+    """The sensor data from TOUScheduler.to_dict, read by the sensors by key."""
+
+    # Battery data
+    batt_wh_usable: int | str
+    batt_soc: float
+    power_battery: float
+    batt_time: float
+    batt_exhausted: datetime
+    # PV data
+    power_pv: float
+    power_pv_estimated: float
+    day_pv_estimated: float
+    # Inverter info
+    inverter_status: str
+    data_updated: str
+    power_grid: float
+    power_load: float
+    load_estimate: float
+    # Boost data
+    actual_grid_boost: int
+    manual_grid_boost: int
+    grid_boost_mode: str
+    grid_boost_soc: int
+    grid_boost_day: str
+    grid_boost_start: str
+    grid_boost_on: str
+    update_hour: int
+    # Boost entity
+    calculated_boost: int
+    manual_boost: int
+    min_soc: int
+    confidence: int
+    load_days: int
+    # Plant info (from InverterAPI.sensor_identity, and the plant dates and status)
+    inverter_model: str
+    inverter_serial_number: str
+    plant_id: str
+    plant_name: str
+    plant_image_url: str
+    plant_created: str
+    bearer_token_expires_on: str
+    plant_status: str
+    cloud_status: str
+    # Daily data
+    shading: dict[int, float]
+    load: dict[int, float]
+    day_forecast: float
+
+
 class TOUScheduler:
     """Class to manage Time of Use (TOU) scheduling for Home Assistant.
 
@@ -88,26 +186,25 @@ class TOUScheduler:
         self.hass = hass
         self.config_entry = config_entry
         self.coordinator = coordinator
-        self.timezone = timezone
+        self.timezone = timezone  # (also sets _tz)
         self.status = "Starting"
         self.store_shade: Store = Store(hass, version=1, key=SHADE_KEY)
         self.store_forecast: Store = Store(hass, version=1, key=FORECAST_KEY)
-        # Update_hour helps us do updates just once an hour - indicates ten past the hour for the next update
-        self._update_time = datetime.now(ZoneInfo(self.timezone)).replace(
-            minute=10, second=0, microsecond=0
-        )
+        self.store_solcast_calls: Store = Store(hass, version=1, key=SOLCAST_CALLS_KEY)
 
         # Here is the inverter info
         self.inverter_api: InverterAPI = inverter_api
-        self.load_estimates: dict[str, dict[int, float]] = {}
+        self._inv_tz = ZoneInfo(inverter_api.timezone)
         self.load_estimates_updated: date | None = None
-        self.daily_load_averages: dict[int, float] = {}
+        # Mean load (wH) for each hour of the day, defaulting to 1000 wH until the first estimate
+        self.daily_load_averages: np.ndarray = np.full(24, 1000.0)
 
         # Here is the solcast info
         self.solcast_api: SolcastAPI = solcast_api
 
         # Here is the shading info: default to 0.0 for each hour of the day and no last update date
-        self.daily_shading: dict[int, float] = {hour: 0.0 for hour in range(24)}
+        self.daily_shading: np.ndarray = np.zeros(24)
+        self._shading_dirty: bool = False
 
         # Here is the TOU boost info we will monitor and update
         self.batt_minutes_remaining: int = 0
@@ -115,112 +212,209 @@ class TOUScheduler:
         self.calculated_grid_boost_day: str = ""
         self.min_battery_soc: int = DEFAULT_GRID_BOOST_MIDNIGHT_SOC
         self.grid_boost_start: str = DEFAULT_GRID_BOOST_START
-        self._boost: str = "Testing"
+        self._boost: BoostMode = BoostMode.TESTING
         self.days_of_load_history: int = DEFAULT_GRID_BOOST_HISTORY
+        # Recorder statistics for the current hour (see _hourly_statistics)
+        self._pv_sensor = f"sensor.{inverter_api.plant_id}_tou_power_pv"
+        self._load_sensor = f"sensor.{inverter_api.plant_id}_tou_power_load"
+        self._statistics: dict[str, list[dict]] = {}
+        self._statistics_hour: datetime | None = None
+        self._statistics_ids: set[str] = set()
         self._update_tou_boost: bool = False
+        # Monotonic time of the last inverter refresh (see _maybe_refresh_inverter)
+        self._inverter_refreshed: float = 0.0
+        # Options changed by the service calls, waiting to be written (see _queue_options)
+        self._pending_options: dict[str, str | int] = {}
+        self._options_flush: CALLBACK_TYPE | None = None
+        self._remove_options_listener: CALLBACK_TYPE | None = None
+        # The shading and load tables for the sensor data, with the array contents they were built from
+        self._daily_tables: tuple[tuple, dict[str, dict[int, float]]] | None = None
+
+    @property
+    def timezone(self) -> str:
+        """The Home Assistant timezone name."""
+        return self._timezone
+
+    @timezone.setter
+    def timezone(self, value: str) -> None:
+        """Set the timezone name and the cached ZoneInfo for it."""
+        self._timezone = value
+        self._tz = ZoneInfo(value)
 
     # Data loading and saving
     async def async_load_shading(self):
         """Load shading data from storage."""
         data = await self.store_shade.async_load()
-        data = {int(k): v for k, v in data.items()} if data else None
-        if data is not None:
-            self.daily_shading = data
+        if not data:
+            return
+        # Older versions stored the shading as a dict keyed by the hour (as a string)
+        if isinstance(data, dict):
+            data = [data.get(str(hour), 0.0) for hour in range(24)]
+        self.daily_shading = np.asarray(data, dtype=np.float64)
 
     async def async_save_shading(self):
         """Save shading data to storage."""
-        await self.store_shade.async_save(self.daily_shading)
+        await self.store_shade.async_save(self.daily_shading.tolist())
 
     async def async_load_forecast(self):
-        """Load forecast data from storage."""
+        """Load forecast data from storage.
+
+        We store the raw Solcast periods with the time they were fetched, so after a restart the forecast
+        is rebuilt and refresh_data knows whether a new API call is due.
+        """
         data = await self.store_forecast.async_load()
-        if data is not None:
-            self.solcast_api.forecast = data
+        if not data:
+            return
+        if "forecasts" in data:
+            self.solcast_api.raw_forecast = data["forecasts"]
+            self.solcast_api.process_forecast()
+            if data.get("data_updated"):
+                self.solcast_api.data_updated = datetime.fromisoformat(data["data_updated"])
+            return
+
+        # Older storage held the processed forecast, keyed by UTC hours since the epoch. JSON storage turns
+        #  the integer keys into strings and the tuples into lists; entries with the even older yyyy-mm-dd-h
+        #  keys are dropped. The keys are moved to the local clock hours the forecast now uses.
+        hour_key = self.solcast_api.hour_key
+        forecast = {
+            hour_key(datetime.fromtimestamp(int(k) * 3600, self._tz)): tuple(v)
+            for k, v in data.items()
+            if k.isdigit()
+        }
+        self.solcast_api.set_hourly_forecast(forecast)
+        if forecast:
+            # The first forecast hour is (about) when the data was fetched
+            self.solcast_api.data_updated = self.solcast_api.hour_start(
+                self.solcast_api.first_hour
+            ) - timedelta(hours=1)
+
+    def _forecast_data(self) -> dict:
+        """Return the forecast data as it is stored."""
+        data_updated = self.solcast_api.data_updated
+        return {
+            "data_updated": data_updated.isoformat() if data_updated else None,
+            "forecasts": self.solcast_api.raw_forecast,
+        }
 
     async def async_save_forecast(self):
         """Save forecast data to storage."""
-        await self.store_forecast.async_save(self.solcast_api.forecast)
+        await self.store_forecast.async_save(self._forecast_data())
+
+    async def async_load_solcast_calls(self):
+        """Load the recent Solcast request times from storage."""
+        data = await self.store_solcast_calls.async_load()
+        if data is not None:
+            self.solcast_api.api_calls = [float(t) for t in data]
+
+    async def async_save_solcast_calls(self):
+        """Save the recent Solcast request times to storage."""
+        await self.store_solcast_calls.async_save(self.solcast_api.api_calls)
 
     async def async_update_boost_settings(self, boost_mode: str, manual_grid_boost: int, min_battery_soc: int, percentile: int, days_of_load_history: int, boost_hour: int) -> None:
         """Service call to allow tou-scheduler-card.js to return settings data."""
-        self._boost = boost_mode
+        self._boost = parse_boost_mode(boost_mode)
         self.inverter_api.manual_grid_boost = manual_grid_boost
         self.min_battery_soc = min_battery_soc
         self.solcast_api.percentile = percentile
         self.days_of_load_history = days_of_load_history
         self.solcast_api.update_hour = boost_hour
 
-        # Call the coordinator and request async_request_refresh
-        if self.coordinator:
-            await self.coordinator.async_request_refresh()
+        # Push the new settings to the sensors
+        self._publish()
+
 
+    def _queue_options(self, **changes: str | int) -> None:
+        """Queue changed options and write them to the config entry half a second after the last change.
+
+        Several settings changed together from the card are written, and the sensors updated, once.
+        """
+        self._pending_options.update(changes)
+        if self._options_flush:
+            self._options_flush()
+        self._options_flush = async_call_later(self.hass, 0.5, self._flush_options)
+
+    async def _flush_options(self, _now: datetime) -> None:
+        """Write the queued options to the config entry and update the sensors."""
+        self._options_flush = None
+        options, self._pending_options = self._pending_options, {}
+        # A change runs the options listener, which updates the sensors. Otherwise update them here.
+        if not self.hass.config_entries.async_update_entry(
+            self.config_entry, options={**self.config_entry.options, **options}
+        ):
+            await self.update_sensors()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening for option changes and write any queued options now, without updating the sensors.
+
+        Called when the entry is unloaded, before the sessions are closed.
+        """
+        if self._remove_options_listener:
+            self._remove_options_listener()
+            self._remove_options_listener = None
+        if self._options_flush:
+            self._options_flush()
+            self._options_flush = None
+        if self._pending_options:
+            options, self._pending_options = self._pending_options, {}
+            self.hass.config_entries.async_update_entry(
+                self.config_entry, options={**self.config_entry.options, **options}
+            )
 
     async def set_boost(self, boost: str) -> None:
         """Set the boost mode."""
-        self._boost = boost
-        self.hass.config_entries.async_update_entry(
-            self.config_entry,
-            options={**self.config_entry.options, "boost_mode": boost},
-        )
-        await self.update_sensors()
+        self._boost = parse_boost_mode(boost)
+        self._queue_options(boost_mode=str(self._boost))
 
     async def set_manual_grid_boost(self, manual_grid_boost: int) -> None:
         """Set the manual grid boost value."""
         self.inverter_api.manual_grid_boost = manual_grid_boost
-        self.hass.config_entries.async_update_entry(
-            self.config_entry,
-            options={**self.config_entry.options, "manual_grid_boost": manual_grid_boost},
-        )
-        await self.update_sensors()
+        self._queue_options(manual_grid_boost=manual_grid_boost)
 
     async def set_solcast_percentile(self, percentile: int) -> None:
         """Set the Solcast percentile value."""
         self.solcast_api.percentile = percentile
-        self.hass.config_entries.async_update_entry(
-            self.config_entry,
-            options={**self.config_entry.options, "percentile": percentile},
-        )
-        await self.update_sensors()
+        self._queue_options(percentile=percentile)
 
     async def set_solcast_update_hour(self, update_hour: str) -> None:
         """Set the Solcast update hours."""
         self.solcast_api.update_hour = int(update_hour)
-        self.hass.config_entries.async_update_entry(
-            self.config_entry,
-            options={**self.config_entry.options, "forecast_hour": update_hour},
-        )
-        await self.update_sensors()
+        self._queue_options(forecast_hour=update_hour)
 
     async def set_days_of_load_history(self, days_of_load_history: int) -> None:
         """Set the days of load history."""
         self.days_of_load_history = days_of_load_history
-        self.hass.config_entries.async_update_entry(
-            self.config_entry,
-            options={**self.config_entry.options, "history_days": days_of_load_history},
-        )
-        await self.update_sensors()
+        self._queue_options(history_days=days_of_load_history)
 
-    async def _request_ha_statistics(
-        self, entity_ids: set[str], days: int
-    ) -> defaultdict:
-        """Request the mean hourly statistics for the given entity_id using units unit for the number of days specified.
+    async def _hourly_statistics(self) -> dict[str, list[dict]]:
+        """Return the mean hourly statistics needed this hour, from one recorder query.
 
+        The PV sensor is needed for last hour's shading, and once a day the load sensor is needed for
+        days_of_load_history days (up to midnight) of load estimates. When both are due they are fetched
+        together in one window, and the result is kept for the rest of the hour.
         This uses a background task to prevent thread blocking.
         """
-        # Initialize the start and end date range for yesterday
-        if self.inverter_api is None:
-            logger.error("Cannot request HA statistics. Inverter API is not set")
-            return defaultdict()
-
-        now = datetime.now(ZoneInfo(self.inverter_api.timezone))
-        end_time = datetime.combine(now.date(), datetime.min.time()).replace(
-            tzinfo=ZoneInfo(self.inverter_api.timezone)
-        )
-        start_time = end_time - timedelta(days=int(days))
+        now = datetime.now(self._inv_tz)
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        load_due = self.load_estimates_updated != now.date()
+        if self._statistics_hour == hour_start and (
+            not load_due or self._load_sensor in self._statistics_ids
+        ):
+            return self._statistics
+
+        # Last hour for the PV, extended back to cover the load history if the load estimates are due
+        start_time = hour_start - timedelta(hours=1)
+        entity_ids = {self._pv_sensor}
+        if load_due:
+            midnight = datetime.combine(now.date(), datetime.min.time()).replace(
+                tzinfo=self._inv_tz
+            )
+            start_time = midnight - timedelta(days=int(self.days_of_load_history))
+            entity_ids.add(self._load_sensor)
 
         # Convert start_time and end_time to UTC
-        start_time_utc = start_time.astimezone(ZoneInfo("UTC"))
-        end_time_utc = end_time.astimezone(ZoneInfo("UTC"))
+        start_time_utc = start_time.astimezone(UTC)
+        end_time_utc = hour_start.astimezone(UTC)
 
         # Log the request
         logger.debug(
@@ -230,35 +424,26 @@ class TOUScheduler:
             end_time_utc.strftime("%a at %-I %p"),
         )
 
-        return await get_instance(self.hass).async_add_executor_job(
+        self._statistics = await get_instance(self.hass).async_add_executor_job(
             self._get_statistics_during_period,
             start_time_utc,
             end_time_utc,
             entity_ids,
         )
+        self._statistics_hour = hour_start
+        self._statistics_ids = entity_ids
+        return self._statistics
 
     async def _get_pv_statistic_for_last_hour(self) -> float:
         """Get the mean PV power for the last hour."""
-        # Set the sensor entity_id and the start and end time to get the last hour's statistics
-        entity_id = f"sensor.{self.inverter_api.plant_id}_tou_power_pv"
-        now = datetime.now(ZoneInfo(self.inverter_api.timezone))
-        start_of_last_hour = now.replace(minute=0, second=0, microsecond=0) - timedelta(
-            hours=1
-        )
-        end_of_last_hour = (
-            start_of_last_hour + timedelta(hours=1) - timedelta(microseconds=1)
-        )
-
-        # Get the statistics for the last hour
-        stats = await get_instance(self.hass).async_add_executor_job(
-            self._get_statistics_during_period,
-            start_of_last_hour,
-            end_of_last_hour,
-            {entity_id},
-        )
-
-        # Extract the mean value for the entity_id
-        mean_value = stats.get(entity_id, [{}])[0].get("mean", 0.0)
+        stats = await self._hourly_statistics()
+        start_of_last_hour = self._statistics_hour - timedelta(hours=1)
+
+        # Extract the mean value for the last hour's bucket (the latest one) of the PV sensor
+        pv_stats = stats.get(self._pv_sensor)
+        mean_value = 0.0
+        if pv_stats and pv_stats[-1].get("start") == start_of_last_hour.timestamp():
+            mean_value = pv_stats[-1].get("mean") or 0.0
         logger.debug(
             ">>>>PV power generation at %s was %s wH<<<<",
             printable_hour(start_of_last_hour.hour),
@@ -271,9 +456,9 @@ class TOUScheduler:
         start_time: datetime,
         end_time: datetime,
         entity_ids: set[str],
-    ) -> defaultdict:
+    ) -> dict[str, list[dict]]:
         """Get statistics during the specified period."""
-        stats = statistics.statistics_during_period(
+        return statistics.statistics_during_period(
             self.hass,
             start_time,
             end_time,
@@ -281,8 +466,7 @@ class TOUScheduler:
             "hour",
             None,
             {"mean"},
-        )
-        return defaultdict(list, stats)
+        ) or {}
 
     # Methods to manage options changes by the user
     async def _handle_options_dialog(
@@ -299,7 +483,7 @@ class TOUScheduler:
         self, user_input: MappingProxyType[str, str | int]
     ) -> None:
         """Update the options and process the changes."""
-        self._boost = str(user_input.get("boost_mode", "Testing"))
+        self._boost = parse_boost_mode(user_input.get("boost_mode", BoostMode.TESTING))
         self.inverter_api.manual_grid_boost = int(
             user_input.get("manual_grid_boost", DEFAULT_MANUAL_GRID_BOOST)
         )
@@ -337,8 +521,19 @@ class TOUScheduler:
         We then reset the average PV power to the first value for this hour. and repeat the process for the next hour.
         """
 
-        # Only do this if we are in automated mode or testing mode
-        if self._boost != "Automated" or self._boost != "Testing":
+        # Only do this if we are in automatic mode or testing mode
+        if self._boost not in (BoostMode.AUTOMATIC, BoostMode.TESTING):
+            return
+
+        # Update shading only if the battery soc is low enough to allow charging, the sun was full and we
+        #  expected PV power. Check these in-memory values before asking the recorder for the PV statistics.
+        sun_estimate = self.solcast_api.get_previous_hour_sun_estimate()
+        pv_estimate = self.solcast_api.get_previous_hour_pv_estimate()
+        if (
+            self.inverter_api.realtime_battery_soc >= 96
+            or sun_estimate <= 0.95
+            or pv_estimate <= 0
+        ):
             return
 
         # Get the pv data for the current hour, calculate the average PV power for the past hour, updating as needed
@@ -347,83 +542,84 @@ class TOUScheduler:
         logger.debug(
             "Average PV power for the past hour: %s, last sun estimate is: %.2f",
             pv_average,
-            self.solcast_api.get_previous_hour_sun_estimate(),
+            sun_estimate,
         )
-        # Update shading if we had a positive average PV power, battery soc is low enough to allow charging, and the sun was full
-        last_hour = (datetime.now(ZoneInfo(self.timezone)).hour - 1) % 24
-        if (
-            pv_average > 0
-            and self.solcast_api.get_previous_hour_pv_estimate() > 0
-            and self.inverter_api.realtime_battery_soc < 96
-            and self.solcast_api.get_previous_hour_sun_estimate() > 0.95
-        ):
-            shading = 1 - min(
-                pv_average / self.solcast_api.get_previous_hour_pv_estimate(), 1
-            )
+        # Update shading if we had a positive average PV power
+        if pv_average > 0:
+            last_hour = (datetime.now(self._tz).hour - 1) % 24
+            shading = 1 - min(pv_average / pv_estimate, 1)
             self.daily_shading[last_hour] = shading
             logger.info(
                 "Shading for %s changed to %s. Last hour sun estimate is %.2f",
                 last_hour,
                 shading,
-                self.solcast_api.get_previous_hour_sun_estimate(),
+                sun_estimate,
             )
 
-            # Write the shading to the hass storage
-            await self.async_save_shading()
+            # Mark the shading to be written to the hass storage (see _hourly_updates)
+            self._shading_dirty = True
 
     async def _calculate_load_estimates(self) -> None:
         """Calculate the daily load averages once a day."""
 
         # Skip already done today
-        if (
-            self.load_estimates_updated is not None
-            and self.load_estimates_updated
-            == datetime.now(ZoneInfo(self.inverter_api.timezone)).date()
-        ):
+        today = datetime.now(self._inv_tz).date()
+        if self.load_estimates_updated == today:
             return
 
-        sensor = f"sensor.{self.inverter_api.plant_id}_tou_power_load"
-        load_entity_ids = {sensor}
-        history_data = await self._request_ha_statistics(
-            load_entity_ids, self.days_of_load_history
-        )
-
-        data = []
-        for data_list in history_data.values():
-            for item in data_list:
-                # Ensure that each item is valid
-                if (
-                    not isinstance(item, dict)
-                    or "start" not in item
-                    or "mean" not in item
-                ):
-                    logger.debug("Skipping invalid item: %s", item)
-                    continue
-
-                start_time = datetime.fromtimestamp(
-                    item["start"], tz=ZoneInfo(self.inverter_api.timezone)
-                )
-                data.append({"hour": start_time.hour, "mean": item["mean"]})
-
-        # Create DataFrame
-        df = pd.DataFrame(data)
-
-        # Check if DataFrame is empty or missing columns
-        if df.empty or "hour" not in df.columns or "mean" not in df.columns:
+        stats = await self._hourly_statistics()
+        data_list = stats.get(self._load_sensor, [])
+        # The load history ends at midnight; today's hours are not part of it
+        midnight = datetime.combine(today, datetime.min.time()).replace(
+            tzinfo=self._inv_tz
+        ).timestamp()
+
+        # Collect the start time and mean load of each statistic into arrays
+        starts = np.empty(len(data_list), dtype=np.float64)
+        means = np.empty(len(data_list), dtype=np.float64)
+        count = 0
+        for item in data_list:
+            # Ensure that each item is valid
+            if (
+                not isinstance(item, dict)
+                or "start" not in item
+                or item.get("mean") is None
+            ):
+                logger.debug("Skipping invalid item: %s", item)
+                continue
+            if item["start"] >= midnight:
+                continue
+            starts[count] = item["start"]
+            means[count] = item["mean"]
+            count += 1
+
+        # Check if we found any data
+        if not count:
             logger.warning("No valid load data found. Skipping load estimates.")
-            self.daily_load_averages = {hour: 1000.0 for hour in range(24)}
+            self.daily_load_averages = np.full(24, 1000.0)
             return
 
-        # Group by "hour" and get averages
-        self.daily_load_averages = df.groupby("hour")["mean"].mean().to_dict()
+        # Average the history by hour of day in a worker thread, so the event loop is not held up by
+        #  a long history
+        self.daily_load_averages = await self.hass.async_add_executor_job(
+            hourly_load_averages, starts[:count], means[:count], self._inv_tz
+        )
 
-        self.load_estimates_updated = datetime.now(
-            ZoneInfo(self.inverter_api.timezone)
-        ).date()
+        self.load_estimates_updated = today
 
         # Log the results (optional)
         # logger.debug("Daily load averages: %s", self.daily_load_averages)
 
+    def _simulation_arrays(
+        self, hour_keys: np.ndarray, hours: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the load (wH), PV forecast (wH, before shading) and shading for a run of hours.
+
+        hour_keys are the forecast keys of the hours, and hours the matching hours of the day.
+        """
+        pv = 1000 * self.solcast_api.target_pv_for(hour_keys)
+        return self.daily_load_averages[hours], pv, self.daily_shading[hours]
+
     async def _calculate_tou_battery_remaining_time(self) -> None:
         """Calculate remaining battery life.
 
@@ -432,14 +628,10 @@ class TOUScheduler:
 
         # For each hour going forward, we need to calculate how long the battery will last until completely exhausted.
         # Set initial variables
-        now = datetime.now(ZoneInfo(self.inverter_api.timezone))
-        day = now.date()
+        now = datetime.now(self._inv_tz)
         hour: int = now.hour
-        starting_time = datetime.now(ZoneInfo(self.inverter_api.timezone)).strftime(
-            "%a %-I %p"
-        )
+        starting_time = now.strftime("%a %-I %p")
         batt_wh_usable = float(self.inverter_api.batt_wh_usable or 0.0)
-        minutes = 0
         # REMOVED GRID BOOST RANGE CHECKING SO WE CAN SEE THE BATTERY LIFE WITHOUT ANY GRID HELP
         # boost_min_wh: float = self.inverter_api.batt_wh_per_percent * float(
         #     self.inverter_api.actual_grid_boost
@@ -457,37 +649,39 @@ class TOUScheduler:
             printable_hour(hour),
             batt_wh_usable,
         )
-        while batt_wh_usable > 0 and minutes < 5 * 24 * 60:
-            # For each hour, calculate the impact of the solar generation and load.
-            load = (
-                self.daily_load_averages.get(hour, 1000) / self.inverter_api.efficiency
-            )
-            pv = (
-                1000
-                * self.solcast_api.forecast.get(f"{day}-{hour}", (0.0, 0.0))[0]
-                * (1 - self.daily_shading.get(hour, 0.0))
-            )
-            batt_wh_usable = batt_wh_usable - load + pv
-            # REMOVING GRID BOOST RANGE CHECK, AS NOTED ABOVE
-            # if hour in boost_range and batt_wh_usable < boost_min_wh:
-            #     batt_wh_usable = boost_min_wh
-            logger.debug(
-                "At %s battery energy is %6s wH.",
-                printable_hour((hour + 1) % 24),
-                f"{batt_wh_usable:6,.0f}",
-            )
-            # Monitor progress
-            if batt_wh_usable > 0:
-                minutes += 60
-            else:
-                minutes -= int((batt_wh_usable / (pv - load)) * 60)
-            # Move to next hour
-            hour = (hour + 1) % 24
-            if hour == 0:
-                day = day + timedelta(days=1)
+
+        # For each of the next 5 days of hours, the impact of the solar generation and load,
+        #  and the battery energy left at the end of the hour
+        horizon = 5 * 24
+        steps = np.arange(horizon)
+        load, pv, shading = self._simulation_arrays(
+            self.solcast_api.hour_key(now) + steps, (hour + steps) % 24
+        )
+        net_power = pv * (1 - shading) - load / self.inverter_api.efficiency
+        running = batt_wh_usable + np.cumsum(net_power)
+
+        # Find the first hour the battery runs out, and how far into that hour it lasts
+        lowest = float(running.min())
+        if batt_wh_usable <= 0:
+            minutes = 0
+        elif lowest > 0:
+            # Never exhausted: no need to find the hour, or to log all 5 days of it
+            minutes = horizon * 60
+            logger.debug("Lowest battery energy in the next 5 days is %.0f wH.", lowest)
+        else:
+            hours_run = int(np.argmax(running <= 0))
+            remaining = running[hours_run - 1] if hours_run else batt_wh_usable
+            minutes = hours_run * 60 + int(remaining / -net_power[hours_run] * 60)
+            if logger.isEnabledFor(logging.DEBUG):
+                for step in range(hours_run + 1):
+                    logger.debug(
+                        "At %s battery energy is %6.0f wH.",
+                        printable_hour((hour + step + 1) % 24),
+                        running[step],
+                    )
 
         self.batt_minutes_remaining = minutes
-        if minutes >= 5 * 24 * 60:
+        if minutes >= horizon * 60:
             logger.info(
                 "At %s: Battery will not be exhausted in the next 5 days.",
                 starting_time,
@@ -509,28 +703,28 @@ class TOUScheduler:
 
         # Initialize variables
         required_soc = float(DEFAULT_GRID_BOOST_STARTING_SOC)
-        tomorrow = datetime.now(ZoneInfo(self.timezone)).date() + timedelta(days=1)
+        tomorrow_start = (datetime.now(self._tz) + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        tomorrow = tomorrow_start.date()
         self.calculated_grid_boost_day = tomorrow.strftime("%a")
-        # We want to track the lowest SoC as we walk through the hours
-        lowest_point = 0.0
-        running_soc = 0.0
-
-        # Do the initial calculation for the grid boost SoC
-        for hour in range(6, 24):
-            # Calculate the load for the hour (multiplied by the efficiency factor)
-            load = (
-                self.daily_load_averages.get(int(hour), 1000)
-                * self.inverter_api.efficiency
-            )
-            pv = (
-                1000
-                * self.solcast_api.forecast.get(f"{tomorrow}-{hour}", (0.0, 0.0))[0]
-                * (1 - self.daily_shading.get(hour, 0.0))
-            )
-            net_power = pv - load
-            net_soc = net_power / (self.inverter_api.batt_wh_per_percent or 1)
-            running_soc += net_soc
-            lowest_point = min(lowest_point, running_soc)
+        # Forecast keys for tomorrow's hours (local wall time, so DST changes are handled)
+        hours = np.arange(6, 24)
+        hour_keys = np.array(
+            [
+                self.solcast_api.hour_key(tomorrow_start.replace(hour=int(hour)))
+                for hour in hours
+            ]
+        )
+
+        # Calculate the load for each hour (multiplied by the efficiency factor), the PV after shading,
+        #  and the resulting change in SoC
+        load, pv, shading = self._simulation_arrays(hour_keys, hours)
+        load = load * self.inverter_api.efficiency
+        net_power = pv * (1 - shading) - load
+        net_soc = net_power / (self.inverter_api.batt_wh_per_percent or 1)
+        # We want the lowest SoC reached as we walk through the hours
+        lowest_point = min(0.0, float(np.cumsum(net_soc).min()))
         # We want the starting SoC to be such that our lowest point doesn't drop below the midnight SoC
         lowest_point -= self.min_battery_soc
         # Calculate the required SoC for the grid boost so we don't drop below the minimum SoC
@@ -551,27 +745,20 @@ class TOUScheduler:
         # Calculate additional SOC needed to reach midnight
         logger.info("Hour:    PV  Shade    Load   Net Power   ± SoC    SoC")
 
-        for hour in range(6, 24):
-            # Calculate the load for the hour (multiplied by the efficiency factor)
-            hour_load = (
-                self.daily_load_averages.get(int(hour), 1000)
-                * self.inverter_api.efficiency
-            )
-            hour_pv_forecast = self.solcast_api.forecast.get(f"{tomorrow}-{hour}", 0.0)
-            hour_pv = (
-                hour_pv_forecast[0] * 1000
-                if isinstance(hour_pv_forecast, tuple)
-                else hour_pv_forecast * 1000
-            )
-            hour_shading = self.daily_shading.get(hour, 0.0)
-            hour_net_pv = hour_pv - hour_pv * (hour_shading)
-            net_power = hour_net_pv - hour_load
-            hour_soc = net_power / (self.inverter_api.batt_wh_per_percent or 1)
+        for index, hour in enumerate(range(6, 24)):
+            hour_soc = net_soc[index]
             required_soc += hour_soc
             required_soc = min(100.0, required_soc)
-            shade = int(round(hour_shading * 100, 2))
+            shade = int(round(shading[index] * 100, 2))
             logger.info(
-                f"{printable_hour(hour)}: {hour_pv:5,.0f}  {shade:4d}%  {hour_load:6,.0f}  {net_power:7,.0f} wH   {hour_soc:4,.1f}%  {required_soc:4,.0f}%"  # noqa: G004
+                "%s: %5.0f  %4d%%  %6.0f  %7.0f wH   %4.1f%%  %4.0f%%",
+                printable_hour(hour),
+                pv[index],
+                shade,
+                load[index],
+                net_power[index],
+                hour_soc,
+                required_soc,
             )
         logger.info(msg=hyphen_format.format("Done calculating grid boost SoC"))
 
@@ -579,9 +766,9 @@ class TOUScheduler:
         self.inverter_api.calculated_grid_boost = self.calculated_grid_boost
         await self.inverter_api.write_grid_boost_soc(self._boost)
 
-    # Private hourly update method (called by update_sensors)
+    # Private hourly update method (called by async_hourly_update)
     async def _hourly_updates(self) -> None:
-        """Update the hourly data for the sensors after 10 past the hour.
+        """Update the hourly data for the sensors.
 
         We need to update the following data:
         - Solcast forecast data
@@ -590,17 +777,17 @@ class TOUScheduler:
         - Remaining battery life
         """
 
-        # Skip if we are not at the update time
-        current_time = datetime.now(ZoneInfo(self.timezone))
-        if current_time < self._update_time:
-            return
-
         # Update the daily load estimates (once a day, managed by the load_estimates_updated date)
         await self._calculate_load_estimates()
 
         # See if we need to update the Solcast data (true if successful at startup and as per user schedule)
         #  (Save the update flag for use in the hourly update)
+        last_call = self.solcast_api.api_calls[-1:]
         self._update_tou_boost = await self.solcast_api.refresh_data()
+        if self.solcast_api.api_calls[-1:] != last_call:
+            self.store_solcast_calls.async_delay_save(
+                lambda: self.solcast_api.api_calls, 30
+            )
 
         # Update the hourly shading values
         await self._calculate_shading()
@@ -608,16 +795,18 @@ class TOUScheduler:
         # If the forecast data if it was updated, save it and compute off-peak grid boost based on new
         #  forecast data and shading data
         if self._update_tou_boost:
-            await self.async_save_forecast()
+            # (The Store writes this shortly, off the update path, and flushes it if Home Assistant stops)
+            self.store_forecast.async_delay_save(self._forecast_data, 30)
             await self._calculate_tou_boost_soc()
             self._update_tou_boost = False
 
         # Compute remaining battery life for the user
         await self._calculate_tou_battery_remaining_time()
-        # Update the next update time to ten past the next hour
-        self._update_time = current_time.replace(
-            minute=10, second=0, microsecond=0
-        ) + timedelta(hours=1)
+        # Write changed shading to the hass storage. The Store delays and coalesces the write (and flushes
+        #  it when Home Assistant stops), so storage is written at most once every 10 minutes.
+        if self._shading_dirty:
+            self.store_shade.async_delay_save(lambda: self.daily_shading.tolist(), 600)
+            self._shading_dirty = False
 
     # Public methods
     async def async_start(self) -> None:
@@ -627,28 +816,32 @@ class TOUScheduler:
             logger.error("Config entry is not set.")
             return
 
-        # Get (Calculate) the daily load estimates
-        await self._calculate_load_estimates()
-        # Load the shading data from storage
-        await self.async_load_shading()
-        # Load the forecast data from storage and set the data_updated date if we have forecast data
-        await self.async_load_forecast()
-        if self.solcast_api.forecast:
-            # Get the key with the lowest value
-            lowest_key = min(self.solcast_api.forecast.keys())
-            logger.debug(
-                "First (lowest) key in forecast: %s -> %s", lowest_key, lowest_key
-            )
-            # Get the first period_end from the forecast data and set the data_updated date to this date
-            self.solcast_api.data_updated = datetime.strptime(
-                lowest_key, "%Y-%m-%d-%H"
-            ) - timedelta(hours=1)
+        # Get (Calculate) the daily load estimates from the recorder, and load the shading data, the forecast
+        #  data (and when it was fetched) and the recent Solcast requests from storage. These are independent,
+        #  so do them together.
+        await asyncio.gather(
+            self._calculate_load_estimates(),
+            self.async_load_shading(),
+            self.async_load_forecast(),
+            self.async_load_solcast_calls(),
+        )
         # Load the options from the config entry
         if self.config_entry.options:
             await self._handle_options_dialog(self.hass, self.config_entry)
         # Listen for changes to the options and update the cloud object
-        self.config_entry.add_update_listener(self._options_callback)
+        self._remove_options_listener = self.config_entry.add_update_listener(self._options_callback)
+
+
+    async def _maybe_refresh_inverter(self, min_age: float = 5.0) -> None:
+        """Refresh the inverter data unless it was refreshed in the last min_age seconds.
 
+        The coordinator refresh, the hourly updates and update_sensors can follow each other closely
+        (at startup, for example), so this keeps the cloud from being asked for the same data twice.
+        """
+        if time.monotonic() - self._inverter_refreshed < min_age:
+            return
+        await self.inverter_api.refresh_data()
+        self._inverter_refreshed = time.monotonic()
 
     async def update_sensors(self) -> None:
         """Update the sensors every 5 minutes with the latest data."""
@@ -656,83 +849,115 @@ class TOUScheduler:
         self.status = "Working"
 
         # Update the inverter data for the sensors (done every 5 minutes)
-        #   (This must be done first because the other updates depend on current inverter data, especially at startup)
-        await self.inverter_api.refresh_data()
+        await self._maybe_refresh_inverter()
 
-        # Do hourly updates
-        await self._hourly_updates()
         # Return the updated sensor data
+        self._publish()
+
+    async def async_hourly_update(self) -> None:
+        """Do the hourly updates, at startup and then at ten past each hour, and update the sensors."""
+        # The inverter data must be current first, because the hourly updates depend on it
+        await self._maybe_refresh_inverter()
+        await self._hourly_updates()
+        self._publish()
+
+    def _publish(self) -> None:
+        """Push the current sensor data to the coordinator.
+
+        The data was just brought up to date, so there is no need for the coordinator to fetch it again.
+        """
         if self.coordinator:
-            await self.coordinator.async_request_refresh()
+            self.coordinator.async_publish(self.to_dict())
 
-    def to_dict(self) -> dict[str, float | str | datetime]:
+    async def async_update_data(self) -> TOUSensorData:
+        """Refresh the inverter data, then return the sensor data.
+
+        This is the coordinator update method. The cloud requests are awaited here so they
+        never block the event loop.
+        """
+        await self._maybe_refresh_inverter()
+        return self.to_dict()
+
+    def _daily_data(self) -> dict[str, dict[int, float]]:
+        """Return the hourly shading and load tables for the sensor data.
+
+        These change at most once an hour, so the tables are only rebuilt when the arrays change.
+        The tables are shared between updates and must not be modified.
+        """
+        version = (
+            self.daily_shading.tobytes(),
+            self.daily_load_averages.tobytes(),
+            self.load_estimates_updated is not None,
+        )
+        if self._daily_tables is None or self._daily_tables[0] != version:
+            tables = {
+                "shading": dict(enumerate(self.daily_shading.tolist())),
+                "load": dict(enumerate(self.daily_load_averages.tolist()))
+                if self.load_estimates_updated
+                else {},
+            }
+            self._daily_tables = (version, tables)
+        return self._daily_tables[1]
+
+    def to_dict(self) -> TOUSensorData:
         """Return this sensor data as a dictionary.
 
         This method provides expected battery life statistics and the grid boost value for the upcoming day.
         It also returns the inverter_api data and the solcast_api data.
 
         Returns:
-            dict[str, Any]: A dictionary containing the sensor data.
+            TOUSensorData: A dictionary containing the sensor data.
 
         """
         # Get the current hour
-        hour = datetime.now(ZoneInfo(self.inverter_api.timezone)).hour
-        exhausted = datetime.now(tz=ZoneInfo(self.inverter_api.timezone)) + timedelta(
-            minutes=self.batt_minutes_remaining
+        now = datetime.now(self._inv_tz)
+        hour = now.hour
+        # Round to the minute so clock jitter alone does not make the data look changed
+        exhausted = (now + timedelta(minutes=self.batt_minutes_remaining)).replace(
+            second=0, microsecond=0
         )
+        inverter = self.inverter_api
+        solcast = self.solcast_api
+        realtime = inverter.realtime
         return {
             # Battery data
-            "batt_wh_usable": self.inverter_api.batt_wh_usable or "0",
-            "batt_soc": self.inverter_api.realtime_battery_soc,
-            "power_battery": self.inverter_api.realtime_battery_power,
+            "batt_wh_usable": realtime.batt_wh_usable or "0",
+            "batt_soc": realtime.battery_soc,
+            "power_battery": realtime.battery_power,
             "batt_time": self.batt_minutes_remaining / 60,
             "batt_exhausted": exhausted,
             # PV data
-            "power_pv": self.inverter_api.realtime_pv_power,
-            "power_pv_estimated": self.solcast_api.get_previous_hour_pv_estimate(),
-            "day_pv_estimated": round(self.solcast_api.day_forecast / 1000, 2),
+            "power_pv": realtime.pv_power,
+            "power_pv_estimated": solcast.get_previous_hour_pv_estimate(),
+            "day_pv_estimated": round(solcast.day_forecast / 1000, 2),
             # Inverter info
-            "inverter_model": self.inverter_api.inverter_model or "unknown",
-            "inverter_status": str(self.inverter_api.inverter_status),
-            "inverter_serial_number": self.inverter_api.inverter_serial_number
-            or "unknown",
-            "data_updated": self.inverter_api.data_updated
-            if self.inverter_api.data_updated
-            else "unknown",
-            "power_grid": self.inverter_api.realtime_grid_power,
-            "power_load": self.inverter_api.realtime_load_power,
-            "load_estimate": self.load_estimates.get(str(hour), {}).get(hour, 1000),
+            "inverter_status": str(inverter.inverter_status),
+            "data_updated": realtime.updated or "unknown",
+            "power_grid": realtime.grid_power,
+            "power_load": realtime.load_power,
+            "load_estimate": float(self.daily_load_averages[hour]),
             # Boost data
-            "actual_grid_boost": self.inverter_api.actual_grid_boost,
-            "manual_grid_boost": self.inverter_api.manual_grid_boost,
-            "grid_boost_mode": self._boost,
+            "actual_grid_boost": inverter.actual_grid_boost,
+            "manual_grid_boost": inverter.manual_grid_boost,
+            "grid_boost_mode": str(self._boost),
             "grid_boost_soc": self.calculated_grid_boost,
             "grid_boost_day": self.calculated_grid_boost_day,
             "grid_boost_start": self.grid_boost_start,
-            "grid_boost_on": self._boost,
-            "update_hour": self.solcast_api.update_hour,
+            "grid_boost_on": str(self._boost),
+            "update_hour": solcast.update_hour,
             # Boost entity
             "calculated_boost": self.calculated_grid_boost,
-            "manual_boost": self.inverter_api.manual_grid_boost,
+            "manual_boost": inverter.manual_grid_boost,
             "min_soc": self.min_battery_soc,
-            "confidence": self.solcast_api.percentile,
+            "confidence": solcast.percentile,
             "load_days": self.days_of_load_history,
-            # Plant info
-            "plant_id": self.inverter_api.plant_id or "unknown",
-            "plant_created": str(self.inverter_api.plant_created.date())
-            if self.inverter_api.plant_created
-            else "unknown",
-            "plant_name": self.inverter_api.plant_name or "unknown",
-            "plant_image_url": self.inverter_api.plant_image_url or "",
-            "bearer_token_expires_on": str(
-                self.inverter_api.bearer_token_expires_on.date()
-                if self.inverter_api.bearer_token_expires_on
-                else "unknown"
-            ),
-            "plant_status": str(self.inverter_api.plant_status),
-            "cloud_status": str(self.inverter_api.cloud_status),
+            # Plant info (and the inverter model and serial number)
+            **inverter.sensor_identity,
+            "plant_created": inverter.plant_created_date,
+            "bearer_token_expires_on": inverter.bearer_token_expires_date,
+            "plant_status": str(inverter.plant_status),
+            "cloud_status": str(inverter.cloud_status),
             # Daily data
-            "shading": str(self.daily_shading),
-            "load": str(self.daily_load_averages),
-            "day_forecast": self.solcast_api.day_forecast,
+            **self._daily_data(),
+            "day_forecast": solcast.day_forecast,
         }